@@ -0,0 +1,106 @@
+from models import db, Donor, Donation, BloodInventory, InventorySummary, BLOOD_TYPES
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, select, true
+
+EXPIRING_SOON_DAYS = 7
+
+
+def stock_status(units):
+    """Stock level label used by the dashboard and inventory pages"""
+    if units == 0:
+        return 'critical'
+    if units < 5:
+        return 'low'
+    if units < 15:
+        return 'moderate'
+    return 'good'
+
+
+def inventory_breakdown_query(expiry_threshold):
+    """Build the single-round-trip statement behind the dashboard.
+
+    Donor and donation totals are scalar subqueries in a one-row derived
+    table, outer-joined to the per-type rows so the totals survive an empty
+    inventory. Unit counts are read from the maintained inventory_summary
+    counters; only the time-dependent "expiring soon" count still touches
+    blood_inventory, as a range over the expiry_date index.
+    """
+    totals = select(
+        select(func.count(Donor.id)).scalar_subquery().label('total_donors'),
+        select(func.count(Donation.id)).scalar_subquery().label('total_donations'),
+    ).subquery('totals')
+
+    expiring = select(
+        BloodInventory.blood_type,
+        func.count(BloodInventory.id).label('expiring_units'),
+    ).where(
+        BloodInventory.status == 'available',
+        BloodInventory.expiry_date <= expiry_threshold
+    ).group_by(BloodInventory.blood_type).subquery('expiring')
+
+    per_type = select(
+        InventorySummary.blood_type,
+        InventorySummary.status,
+        InventorySummary.units,
+        func.coalesce(expiring.c.expiring_units, 0).label('expiring_units'),
+    ).select_from(InventorySummary).outerjoin(
+        expiring,
+        and_(
+            expiring.c.blood_type == InventorySummary.blood_type,
+            InventorySummary.status == 'available'
+        )
+    ).subquery('per_type')
+
+    return select(
+        totals.c.total_donors,
+        totals.c.total_donations,
+        per_type.c.blood_type,
+        per_type.c.status,
+        per_type.c.units,
+        per_type.c.expiring_units,
+    ).select_from(totals.outerjoin(per_type, true()))
+
+
+def dashboard_stats(now=None):
+    """Compute the /api/dashboard/stats payload with a single query"""
+    now = now or datetime.utcnow()
+    expiry_threshold = now + timedelta(days=EXPIRING_SOON_DAYS)
+    rows = db.session.execute(inventory_breakdown_query(expiry_threshold)).all()
+    return build_dashboard_stats(rows, now)
+
+
+def build_dashboard_stats(rows, now):
+    """Shape inventory_breakdown_query rows into the dashboard payload"""
+    total_donors = rows[0].total_donors if rows else 0
+    total_donations = rows[0].total_donations if rows else 0
+
+    available = {}
+    expiring = {}
+    for row in rows:
+        if row.status != 'available':
+            continue
+        available[row.blood_type] = row.units
+        expiring[row.blood_type] = int(row.expiring_units or 0)
+
+    blood_availability = []
+    low_stock_types = 0
+    for blood_type in BLOOD_TYPES:
+        count = available.get(blood_type, 0)
+        blood_availability.append({
+            'blood_type': blood_type,
+            'units': count,
+            'expiring_units': expiring.get(blood_type, 0),
+            'status': stock_status(count)
+        })
+        if count < 5:
+            low_stock_types += 1
+
+    return {
+        'total_donors': total_donors,
+        'total_donations': total_donations,
+        'available_units': sum(available.values()),
+        'expiring_soon': sum(expiring.values()),
+        'low_stock_types': low_stock_types,
+        'blood_availability': blood_availability,
+        'timestamp': now.isoformat()
+    }
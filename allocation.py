@@ -0,0 +1,67 @@
+"""Compatibility-aware blood allocation with first-expiring-first-out selection."""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from cache import STATS_KEYS, invalidate_on_commit
+from models import BloodInventory, BLOOD_TYPES
+
+# Recipient blood type -> donor types whose red cells it can receive
+COMPATIBLE_DONORS = {
+    'O-': ['O-'],
+    'O+': ['O+', 'O-'],
+    'A-': ['A-', 'O-'],
+    'A+': ['A+', 'A-', 'O+', 'O-'],
+    'B-': ['B-', 'O-'],
+    'B+': ['B+', 'B-', 'O+', 'O-'],
+    'AB-': ['AB-', 'A-', 'B-', 'O-'],
+    'AB+': list(BLOOD_TYPES),
+}
+
+
+class AllocationError(ValueError):
+    """Raised when there is too little compatible stock; `available` is what could be met"""
+
+    def __init__(self, message, available=0):
+        super().__init__(message)
+        self.available = available
+
+
+def allocate_units(session, recipient_type, quantity, allow_partial=False, now=None):
+    """Reserve up to `quantity` compatible units, soonest-expiring first.
+
+    Candidate rows are locked with FOR UPDATE SKIP LOCKED (a no-op on
+    SQLite), so concurrent allocations each get disjoint units without
+    waiting on one another. Unless `allow_partial` is set, nothing is
+    reserved when fewer than `quantity` units are free. The caller commits.
+    Invalid arguments raise a plain ValueError.
+    """
+    if recipient_type not in COMPATIBLE_DONORS:
+        raise ValueError(f'Unknown blood type: {recipient_type}')
+    if quantity < 1:
+        raise ValueError('quantity must be at least 1')
+
+    now = now or datetime.utcnow()
+    units = session.scalars(
+        select(BloodInventory)
+        .where(
+            BloodInventory.blood_type.in_(COMPATIBLE_DONORS[recipient_type]),
+            BloodInventory.status == 'available',
+            BloodInventory.expiry_date > now
+        )
+        .order_by(BloodInventory.expiry_date, BloodInventory.id)
+        .limit(quantity)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    if not units or (len(units) < quantity and not allow_partial):
+        raise AllocationError(
+            f'Only {len(units)} compatible units available for {recipient_type}',
+            available=len(units)
+        )
+
+    for unit in units:
+        unit.status = 'reserved'
+        unit.updated_at = now
+    invalidate_on_commit(session, *STATS_KEYS)
+    return units
@@ -1,18 +1,26 @@
 import os
-from dotenv import load_dotenv
 from flask import Flask, jsonify, render_template
 from flask_cors import CORS
 
 from config import DevelopmentConfig, TestingConfig, ProductionConfig
 from models import db
 from routes import register_routes
+from commands import register_commands
 from database import init_db, seed_sample_data, get_db_stats
-
-load_dotenv()
+from cache import DB_STATS, cached, init_cache
+from expiry import start_expiry_sweeper
+from pool_stats import init_pool_stats
+from routing import init_replica_routing
+from query_log import init_query_logging
+from metrics import init_metrics
+from compression import init_compression
+from conditional import body_etag
+from json_provider import FastJSONProvider
 
 
 def create_app(config_name=None):
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
     # Choose config: Render → Production, else Dev/Testing
     if os.getenv("RENDER"):
@@ -24,21 +32,26 @@ def create_app(config_name=None):
 
     app.config.from_object(config)
 
-    # Debug print: see exactly which DB your app is using
-    print("DB URI IN USE:", app.config["SQLALCHEMY_DATABASE_URI"])
-
     # Allow all origins – safe for your college project
     CORS(app)
 
     # Initialize database
+    init_pool_stats(app)
     db.init_app(app)
+    init_query_logging(app, db)
+    init_metrics(app)
+    init_cache(app)
+    init_compression(app)
 
-    with app.app_context():
+    # Schema and sample data; off in production (use `flask db-init` / `flask seed`)
+    if app.config["AUTO_INIT_DB"]:
         init_db(app)
         seed_sample_data(app)
 
     # Register all API blueprints (donors, donations, inventory, etc.)
     register_routes(app)
+    register_commands(app)
+    start_expiry_sweeper(app)
 
     # ---------- Page routes (HTML) ----------
 
@@ -78,8 +91,9 @@ def create_app(config_name=None):
 
     # Aggregated stats for dashboard & inventory
     @app.route("/api/stats")
+    @body_etag
     def get_stats():
-        stats = get_db_stats(app)
+        stats = cached(DB_STATS, lambda: get_db_stats(app))
         return jsonify(stats)
 
     @app.route("/api/dashboard/stats")
@@ -94,6 +108,9 @@ def create_app(config_name=None):
         # For simplicity, return JSON for all 404s
         return jsonify({"error": "Resource not found"}), 404
 
+    # Send read-only GETs to DATABASE_REPLICA_URL, if one is configured
+    init_replica_routing(app, db)
+
     return app
 
 
@@ -0,0 +1,402 @@
+"""ASGI entry point: async read endpoints in front of the Flask app.
+
+    pip install -r requirements-async.txt
+    uvicorn asgi:app --workers 4
+
+The hot GET endpoints of the donors, donations, inventory and dashboard
+APIs run as Starlette coroutines on an async SQLAlchemy engine (asyncpg on
+PostgreSQL, aiosqlite on SQLite), so a request waiting on the database
+holds no thread. Every other route (writes, exports, pages, /metrics) is
+handed to the Flask app through a WSGI bridge. Responses are rendered with
+the Flask app's JSON provider, so both paths emit identical bodies.
+/api/inventory/stream is served here too, so an open stream costs a
+coroutine rather than one of the bridge's threads.
+"""
+import asyncio
+import contextvars
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import joinedload, undefer
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.exceptions import NotFound
+from werkzeug.http import generate_etag, parse_etags
+
+from aggregates import EXPIRING_SOON_DAYS, build_dashboard_stats, dashboard_stats, inventory_breakdown_query
+from app import create_app
+from cache import DASHBOARD_STATS, cache_slot, cached
+from compression import COMPRESSIBLE_TYPES, choose_encoding, compress
+from conditional import is_not_modified, validator_headers, version_etag, version_query
+from inventory_events import (
+    HEARTBEAT_SECONDS, SNAPSHOT_SECONDS, STREAM_QUEUE_SIZE, broker, ensure_listener, format_event
+)
+from metrics import DB_QUERIES, DB_TIME, REQUEST_LATENCY, REQUESTS
+from models import db, Donor, Donation, BloodInventory, DONATION_ROWS, DONOR_ROWS, INVENTORY_ROWS
+from pagination import PaginationError, page_envelope, page_statement, wants_pagination
+from query_log import instrument_engine, request_usage
+from routing import WROTE_COOKIE
+from singleflight import AsyncSingleFlight
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+WSGI_THREADS = 10
+
+_MISSING = object()
+
+logger = logging.getLogger(__name__)
+
+
+def async_database_url(uri):
+    url = make_url(uri)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f'No async driver for {url.get_backend_name()}')
+    return url.set(drivername=driver)
+
+
+def async_engine_options(options):
+    """Translate SQLALCHEMY_ENGINE_OPTIONS for the async drivers"""
+    options = dict(options)
+    options.pop('poolclass', None)
+    connect_args = options.pop('connect_args', {})
+    # psycopg2 takes "-c statement_timeout=N"; asyncpg takes server_settings
+    match = re.search(r'statement_timeout=(\d+)', connect_args.get('options', ''))
+    if match:
+        options['connect_args'] = {'server_settings': {'statement_timeout': match.group(1)}}
+    return options
+
+
+def create_asgi_app(flask_app=None):
+    flask_app = flask_app or create_app()
+    config = flask_app.config
+    cache = flask_app.extensions['hemobank_cache']
+    flights = AsyncSingleFlight()
+
+    def make_engine(uri, options):
+        engine = create_async_engine(async_database_url(uri), **async_engine_options(options))
+        instrument_engine(engine.sync_engine, config['SLOW_QUERY_MS'], config['QUERY_LOG_SAMPLE_RATE'])
+        return engine
+
+    primary = make_engine(config['SQLALCHEMY_DATABASE_URI'], config['SQLALCHEMY_ENGINE_OPTIONS'])
+    engines = [primary]
+    sessions = async_sessionmaker(primary, expire_on_commit=False)
+    read_sessions = sessions
+    replica_bind = config.get('SQLALCHEMY_BINDS', {}).get('replica')
+    if replica_bind:
+        replica_options = {k: v for k, v in replica_bind.items() if k != 'url'}
+        replica = make_engine(replica_bind['url'], replica_options)
+        engines.append(replica)
+        read_sessions = async_sessionmaker(replica, expire_on_commit=False)
+
+    # The Flask app's ReplicaHealth (routing.py), shared so both paths agree
+    # on whether the replica is down
+    health = flask_app.extensions.get('replica_health')
+    reads_replica = contextvars.ContextVar('reads_replica', default=False)
+
+    async def replica_allowed(request):
+        # Same read-your-writes rule as routing.py: recent writers read the primary
+        if health is None or request.cookies.get(WROTE_COOKIE):
+            return False
+        # available() may probe the replica with a blocking connect
+        return await asyncio.to_thread(health.available)
+
+    def session_for(request):
+        return read_sessions() if reads_replica.get() else sessions()
+
+    async def run_with_fallback(handler, request):
+        """Run `handler` on the replica if allowed, re-running it on the primary if that fails"""
+        token = reads_replica.set(await replica_allowed(request))
+        try:
+            try:
+                return await handler(request)
+            except DBAPIError:
+                if not reads_replica.get():
+                    raise
+                logger.warning('Replica query failed; retrying on the primary', exc_info=True)
+                health.mark_down()
+                reads_replica.set(False)
+                return await handler(request)
+        finally:
+            reads_replica.reset(token)
+
+    # Same layout as flask.jsonify: indented in debug, compact otherwise
+    dump_args = {'indent': 2} if flask_app.debug else {'separators': (',', ':')}
+
+    def json_response(payload, status=200):
+        body = flask_app.json.dumps(payload, **dump_args) + '\n'
+        return Response(body, status, media_type='application/json')
+
+    def compressed(request, response):
+        """Same rules as compression.init_compression"""
+        if response.status_code != 200 or response.media_type not in COMPRESSIBLE_TYPES:
+            return response
+        response.headers.add_vary_header('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('accept-encoding', ''))
+        if encoding is None or len(response.body) < config['COMPRESS_MIN_BYTES']:
+            return response
+        response.body = compress(response.body, encoding)
+        response.headers['Content-Length'] = str(len(response.body))
+        response.headers['Content-Encoding'] = encoding
+        etag = response.headers.get('etag')
+        if etag and not etag.startswith('W/'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+    def table_etag(*models, clock=False):
+        """Async counterpart of conditional.table_etag"""
+        def decorator(handler):
+            async def wrapper(request):
+                try:
+                    async with session_for(request) as session:
+                        row = (await session.execute(version_query(*models))).one()
+                except Exception:
+                    logger.exception('Could not read table versions for %s', request.url.path)
+                    return await handler(request)
+                time_window = config['ETAG_TIME_WINDOW'] if clock else None
+                full_path = f'{request.url.path}?{request.url.query}'
+                etag = version_etag(row, full_path, time_window)
+                headers = validator_headers(etag, weak=clock)
+                if is_not_modified(parse_etags(request.headers.get('if-none-match')), etag):
+                    return Response(status_code=304, headers=headers)
+                response = await handler(request)
+                if response.status_code == 200:
+                    response.headers.update(headers)
+                return response
+            return wrapper
+        return decorator
+
+    def body_etag(handler):
+        """Async counterpart of conditional.body_etag"""
+        async def wrapper(request):
+            response = await handler(request)
+            if response.status_code != 200:
+                return response
+            etag = generate_etag(response.body)
+            headers = validator_headers(etag)
+            if parse_etags(request.headers.get('if-none-match')).contains_weak(etag):
+                return Response(status_code=304, headers=headers)
+            response.headers.update(headers)
+            return response
+        return wrapper
+
+    def endpoint(name):
+        """Error handling, compression and Prometheus metrics matching the Flask endpoints"""
+        def decorator(handler):
+            async def wrapper(request):
+                usage = [0, 0.0]
+                token = request_usage.set(usage)
+                started = time.perf_counter()
+                try:
+                    response = await run_with_fallback(handler, request)
+                except PaginationError as e:
+                    response = json_response({'error': str(e)}, 400)
+                except Exception as e:
+                    response = json_response({'error': str(e)}, 500)
+                finally:
+                    request_usage.reset(token)
+                response = compressed(request, response)
+                REQUEST_LATENCY.labels(name, request.method).observe(time.perf_counter() - started)
+                REQUESTS.labels(name, request.method, str(response.status_code)).inc()
+                DB_QUERIES.labels(name).observe(usage[0])
+                DB_TIME.labels(name).observe(usage[1])
+                return response
+            return wrapper
+        return decorator
+
+    async def page_or_list(request, statement, shape, sort_columns):
+        serialize = shape.serializer()
+        async with session_for(request) as session:
+            if wants_pagination(request.query_params):
+                statement, page = page_statement(
+                    statement, shape.model, sort_columns, request.query_params, tuples=True
+                )
+                return json_response(page_envelope(await session.execute(statement), page, serialize))
+            rows = (await session.execute(statement)).all()
+            return json_response([serialize(row) for row in rows])
+
+    @endpoint('donors.get_all_donors')
+    @table_etag(Donor, Donation)
+    async def get_all_donors(request):
+        return await page_or_list(
+            request, DONOR_ROWS.select(), DONOR_ROWS, [Donor.registered_on, Donor.id]
+        )
+
+    @endpoint('donors.get_donor')
+    async def get_donor(request):
+        async with session_for(request) as session:
+            donor = await session.get(
+                Donor, request.path_params['donor_id'], options=[undefer(Donor.donation_count)]
+            )
+            if donor is None:
+                return json_response({'error': str(NotFound())}, 404)
+            return json_response(donor.to_dict())
+
+    @endpoint('donations.get_all_donations')
+    @table_etag(Donation, Donor)
+    async def get_all_donations(request):
+        return await page_or_list(request, DONATION_ROWS.select(), DONATION_ROWS, [Donation.id])
+
+    @endpoint('donations.get_donation')
+    async def get_donation(request):
+        async with session_for(request) as session:
+            donation = await session.get(
+                Donation, request.path_params['donation_id'], options=[joinedload(Donation.donor)]
+            )
+            if donation is None:
+                return json_response({'error': str(NotFound())}, 404)
+            return json_response(donation.to_dict())
+
+    @endpoint('donations.get_donor_donations')
+    async def get_donor_donations(request):
+        async with session_for(request) as session:
+            rows = (await session.execute(
+                DONATION_ROWS.select().where(Donation.donor_id == request.path_params['donor_id'])
+            )).all()
+            serialize = DONATION_ROWS.serializer()
+            return json_response([serialize(row) for row in rows])
+
+    @endpoint('inventory.get_inventory')
+    @table_etag(BloodInventory, clock=True)
+    async def get_inventory(request):
+        return await page_or_list(
+            request, INVENTORY_ROWS.select().where(BloodInventory.status == 'available'),
+            INVENTORY_ROWS, [BloodInventory.expiry_date, BloodInventory.id]
+        )
+
+    @endpoint('inventory.get_inventory_item')
+    async def get_inventory_item(request):
+        async with session_for(request) as session:
+            item = await session.get(BloodInventory, request.path_params['inventory_id'])
+            if item is None:
+                return json_response({'error': 'Resource not found'}, 404)
+            return json_response(item.to_dict())
+
+    @endpoint('inventory.get_by_blood_type')
+    @table_etag(BloodInventory, clock=True)
+    async def get_by_blood_type(request):
+        async with session_for(request) as session:
+            rows = (await session.execute(INVENTORY_ROWS.select().where(
+                BloodInventory.blood_type == request.path_params['blood_type'],
+                BloodInventory.status == 'available'
+            ))).all()
+            serialize = INVENTORY_ROWS.serializer()
+            return json_response([serialize(row) for row in rows])
+
+    async def dashboard_snapshot(request):
+        # Shares the Flask app's cache, so Flask-side writes invalidate it;
+        # entries are cached()'s (version, value) pairs
+        slot = cache_slot(DASHBOARD_STATS, reads_replica.get())
+        _, stats = cache.get(slot, (None, _MISSING))
+        if stats is _MISSING:
+            generation = cache.generation(slot)
+
+            if config['SINGLE_FLIGHT_SHARED']:
+                # Cross-worker coalescing (advisory lock + cache_snapshots) is
+                # synchronous, so take the Flask path on a thread
+                def shared_snapshot():
+                    with flask_app.app_context():
+                        return cached(DASHBOARD_STATS, dashboard_stats)
+
+                async def compute():
+                    return await asyncio.to_thread(shared_snapshot)
+            else:
+                async def compute():
+                    now = datetime.utcnow()
+                    async with session_for(request) as session:
+                        result = await session.execute(
+                            inventory_breakdown_query(now + timedelta(days=EXPIRING_SOON_DAYS))
+                        )
+                        stats = build_dashboard_stats(result.all(), now)
+                    cache.set(slot, (None, stats), generation)
+                    return stats
+
+            # Concurrent misses share one query; primary reads don't join replica ones
+            stats = await flights.do((slot, generation), compute)
+        return stats
+
+    @endpoint('dashboard.get_stats')
+    @body_etag
+    async def get_stats(request):
+        return json_response(await dashboard_snapshot(request))
+
+    async def stream_inventory(request):
+        """Async counterpart of inventory_events.event_stream"""
+        with flask_app.app_context():
+            ensure_listener(db.engine)
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        overflowed = asyncio.Event()
+
+        def put(payload):
+            try:
+                events.put_nowait(payload)
+            except asyncio.QueueFull:
+                overflowed.set()
+
+        def deliver(payload):
+            # Called from the committing thread or the LISTEN thread
+            loop.call_soon_threadsafe(put, payload)
+
+        async def stream():
+            unsubscribe = broker.subscribe(deliver)
+            try:
+                yield format_event('snapshot', await dashboard_snapshot(request))
+                snapshot_at = time.monotonic()
+                while True:
+                    if overflowed.is_set() or time.monotonic() - snapshot_at >= SNAPSHOT_SECONDS:
+                        overflowed.clear()
+                        while not events.empty():
+                            events.get_nowait()
+                        yield format_event('snapshot', await dashboard_snapshot(request))
+                        snapshot_at = time.monotonic()
+                    try:
+                        payload = await asyncio.wait_for(events.get(), HEARTBEAT_SECONDS)
+                        yield format_event('delta', payload)
+                    except asyncio.TimeoutError:
+                        yield ': keep-alive\n\n'
+            finally:
+                unsubscribe()
+
+        return StreamingResponse(stream(), media_type='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        for engine in engines:
+            await engine.dispose()
+
+    return Starlette(routes=[
+        Route('/api/donors', get_all_donors, methods=['GET']),
+        Route('/api/donors/{donor_id:int}', get_donor, methods=['GET']),
+        Route('/api/donations', get_all_donations, methods=['GET']),
+        Route('/api/donations/{donation_id:int}', get_donation, methods=['GET']),
+        Route('/api/donations/donor/{donor_id:int}', get_donor_donations, methods=['GET']),
+        Route('/api/inventory', get_inventory, methods=['GET']),
+        Route('/api/inventory/stream', stream_inventory, methods=['GET']),
+        Route('/api/inventory/{inventory_id:int}', get_inventory_item, methods=['GET']),
+        Route('/api/inventory/blood-type/{blood_type}', get_by_blood_type, methods=['GET']),
+        Route('/api/dashboard/stats', get_stats, methods=['GET']),
+        # Everything else, including non-GET methods on the paths above
+        Mount('/', app=WSGIMiddleware(flask_app, workers=WSGI_THREADS)),
+    ], middleware=[
+        # The async routes bypass Flask-CORS; apply the same policy as
+        # CORS(app) in app.py (any origin), since this also wraps the mount
+        Middleware(CORSMiddleware, allow_origins=['*'],
+                   allow_methods=['*'], allow_headers=['*'])
+    ], lifespan=lifespan)
+
+
+app = create_asgi_app()
@@ -0,0 +1,135 @@
+"""Throughput of the sync gunicorn setup vs the async ASGI entry point.
+
+Usage:
+    python benchmarks/bench_asgi.py [--donors N] [--workers N] [--concurrency N] [--seconds S]
+
+Prepares a dataset (DATABASE_URL or a throwaway SQLite file), then starts
+`gunicorn wsgi:app` (sync workers, gunicorn.conf.py threads) and
+`uvicorn asgi:app` with the same worker count, one after the other, and
+drives each with --concurrency keep-alive clients polling the dashboard and
+the donor/inventory list pages. Reports requests/s and p50/p95/p99 latency.
+Needs requirements-async.txt installed; use PostgreSQL for meaningful
+numbers, since SQLite serialises connections. Generated donors are
+appended, so pass --donors 0 to reuse an existing DATABASE_URL dataset.
+"""
+import argparse
+import http.client
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = [
+    '/api/dashboard/stats',
+    '/api/dashboard/stats',
+    '/api/donors?limit=50',
+    '/api/inventory?limit=50',
+    '/api/donations?limit=50',
+]
+PORT = 5099
+
+
+def servers(workers):
+    return {
+        'gunicorn (sync)': [sys.executable, '-m', 'gunicorn', '-w', str(workers),
+                            '-b', f'127.0.0.1:{PORT}', 'wsgi:app'],
+        'uvicorn (asgi)': [sys.executable, '-m', 'uvicorn', '--workers', str(workers),
+                           '--port', str(PORT), '--log-level', 'warning', 'asgi:app'],
+    }
+
+
+def wait_until_up(timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=1)
+            connection.request('GET', '/api/health')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def percentile_ms(sorted_seconds, q):
+    if not sorted_seconds:
+        return 0.0
+    return sorted_seconds[min(len(sorted_seconds) - 1, int(q * len(sorted_seconds)))] * 1000
+
+
+def drive(concurrency, seconds):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client():
+        connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+        mine = []
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request('GET', random.choice(PATHS))
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 500:
+                    raise OSError(response.status)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+                continue
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return (len(latencies) / wall, percentile_ms(latencies, 0.50), percentile_ms(latencies, 0.95),
+            percentile_ms(latencies, 0.99), errors[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--donors', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=15)
+    args = parser.parse_args()
+
+    env = dict(os.environ, AUTO_INIT_DB='0', LOG_LEVEL='WARNING', QUERY_LOG_SAMPLE_RATE='0')
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'asgi.db'))
+    env.setdefault('PROMETHEUS_MULTIPROC_DIR', tempfile.mkdtemp())
+    flask = [sys.executable, '-m', 'flask', '--app', 'wsgi']
+    subprocess.run(flask + ['db-init'], cwd=ROOT, env=env, check=True, capture_output=True)
+    if args.donors:
+        subprocess.run(flask + ['generate-data', '--donors', str(args.donors), '--seed', '1'],
+                       cwd=ROOT, env=env, check=True, capture_output=True)
+
+    print(f"{'server':<18} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, command in servers(args.workers).items():
+        process = subprocess.Popen(command, cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_up()
+            drive(4, 1)  # warm-up
+            rps, p50, p95, p99, errors = drive(args.concurrency, args.seconds)
+            print(f'{name:<18} {rps:>8.1f} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {errors:>7}')
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark /api/dashboard/stats: per-type COUNT loop vs the single-query path.
+
+Usage:
+    python benchmarks/bench_dashboard_stats.py [rows ...]
+
+Uses DATABASE_URL when set, otherwise a throwaway SQLite file. Defaults to
+10k, 100k and 1M inventory rows.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+from sqlalchemy import event
+
+from app import create_app
+from aggregates import dashboard_stats
+from inventory_summary import rebuild_summary
+from models import db, Donor, Donation, BloodInventory, BLOOD_TYPES
+
+STATUSES = ['available'] * 6 + ['used'] * 3 + ['expired']
+
+
+def legacy_dashboard_stats():
+    """The original implementation: 4 global COUNTs plus 2 per blood type"""
+    total_donors = Donor.query.count()
+    total_donations = Donation.query.count()
+    available_units = BloodInventory.query.filter_by(status='available').count()
+    expiry_threshold = datetime.utcnow() + timedelta(days=7)
+    expiring_soon = BloodInventory.query.filter(
+        BloodInventory.expiry_date <= expiry_threshold,
+        BloodInventory.status == 'available'
+    ).count()
+    for blood_type in BLOOD_TYPES:
+        BloodInventory.query.filter_by(blood_type=blood_type, status='available').count()
+        BloodInventory.query.filter(
+            BloodInventory.blood_type == blood_type,
+            BloodInventory.expiry_date <= expiry_threshold,
+            BloodInventory.status == 'available'
+        ).count()
+    return total_donors, total_donations, available_units, expiring_soon
+
+
+def fill_inventory(target, chunk=10000):
+    """Top the inventory table up to `target` rows"""
+    table = BloodInventory.__table__
+    current = BloodInventory.query.count()
+    now = datetime.utcnow()
+    while current < target:
+        rows = []
+        for _ in range(min(chunk, target - current)):
+            donated = now - timedelta(days=random.randint(0, 40))
+            rows.append({
+                'blood_type': random.choice(BLOOD_TYPES),
+                'quantity_ml': 450,
+                'donation_date': donated,
+                'expiry_date': donated + timedelta(days=35),
+                'status': random.choice(STATUSES),
+                'added_at': donated,
+                'created_at': donated,
+                'updated_at': donated,
+            })
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+        current += len(rows)
+    # Raw inserts skip the flush hook that maintains the counters
+    rebuild_summary(db.session)
+    db.session.commit()
+
+
+def measure(fn, repeat=5):
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        fn()  # warm up caches before timing
+        statements.clear()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        elapsed = (time.perf_counter() - start) / repeat
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return len(statements) // repeat, elapsed * 1000
+
+
+def main(sizes):
+    app = create_app()
+    app.config['SQLALCHEMY_ECHO'] = False
+    with app.app_context():
+        db.engine.echo = False
+        print(f"{'rows':>10} {'impl':>8} {'queries':>8} {'ms':>10}")
+        for size in sizes:
+            fill_inventory(size)
+            for name, fn in (('legacy', legacy_dashboard_stats), ('summary', dashboard_stats)):
+                queries, ms = measure(fn)
+                print(f'{size:>10} {name:>8} {queries:>8} {ms:>10.2f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
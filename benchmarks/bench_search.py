@@ -0,0 +1,94 @@
+"""Latency of /api/donors/search with its indexes vs a plain LIKE scan.
+
+Usage:
+    python benchmarks/bench_search.py [--donors N] [--requests N]
+
+Generates --donors donors (default 1,000,000; datagen.py) into DATABASE_URL
+or a throwaway SQLite file, applies the migrations (trigram / FTS5 search
+indexes), then issues --requests searches per query shape through the WSGI
+app, once with the indexed backend and once forced onto the LIKE scan, and
+prints p50/p95 latency for each. Generated donors are appended, so pass
+--donors 0 to reuse an existing DATABASE_URL dataset.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'search.db')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import search
+from app import create_app
+from datagen import generate_dataset
+from migrations import upgrade
+from models import db, Donor
+
+# datagen names donors "Donor <id>" with donor<id>@example.com, phone 7000000000+id
+QUERIES = {
+    'name prefix': {'q': 'Donor 4242'},
+    'name substring': {'q': '42424'},
+    'email prefix': {'q': 'donor4242@'},
+    'phone': {'q': '70000424'},
+    'short prefix': {'q': 'Do'},
+    'typo': {'q': 'Donr 4242'},
+    'filtered': {'q': '4242', 'blood_type': 'O-', 'eligible': 'true'},
+    'filters only': {'blood_type': 'AB-', 'eligible': 'true'},
+}
+
+
+def percentile_ms(sorted_seconds, q):
+    return sorted_seconds[min(len(sorted_seconds) - 1, int(q * len(sorted_seconds)))] * 1000
+
+
+def run(client, params, requests):
+    path = '/api/donors/search?' + urlencode(dict(params, limit=20))
+    client.get(path)  # warm-up
+    latencies = []
+    hits = 0
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - started)
+        hits = len(response.get_json()['items'])
+    latencies.sort()
+    return percentile_ms(latencies, 0.50), percentile_ms(latencies, 0.95), hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--donors', type=int, default=1000000)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        upgrade(db.engine)
+        missing = args.donors - Donor.query.count()
+        if missing > 0:
+            print(f'Generating {missing} donors ...', flush=True)
+            started = time.perf_counter()
+            generate_dataset(missing, donations_per_donor=1, seed=7)
+            print(f'  done in {time.perf_counter() - started:.1f}s', flush=True)
+        key = str(db.engine.url)
+        indexed = search.search_backend(db.session.connection())
+    print(f'{Donor.__tablename__}: {args.donors} donors, indexed backend: {indexed}')
+
+    print(f"{'query':<16} {'backend':<8} {'p50 ms':>8} {'p95 ms':>8} {'hits':>5}")
+    for name, params in QUERIES.items():
+        for backend in (indexed, 'like'):
+            # Pinned: an infinite probe time is never re-probed
+            search._backends[key] = (backend, float('inf'))
+            p50, p95, hits = run(client, params, args.requests)
+            print(f'{name:<16} {backend:<8} {p50:>8.1f} {p95:>8.1f} {hits:>5}')
+        search._backends[key] = (indexed, float('inf'))
+
+
+if __name__ == '__main__':
+    main()
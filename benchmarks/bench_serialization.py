@@ -0,0 +1,99 @@
+"""Rows/sec of the list-endpoint serialization paths, before and after RowShape.
+
+Usage:
+    python benchmarks/bench_serialization.py [--rows N] [--repeat N]
+
+Generates --rows donors with one donation (and inventory unit) each
+(default 100,000; datagen.py) into DATABASE_URL or a throwaway SQLite file,
+then, for each table, times a full 100k-row response body built two ways:
+
+- orm:   ORM instances (with the loader options the endpoints used),
+         to_dict() per row, Flask's stdlib JSON provider;
+- tuple: the RowShape column-tuple select, its serializer with one `now`,
+         FastJSONProvider (orjson when installed).
+
+Prints the best of --repeat runs as rows/sec. Generated rows are appended,
+so pass --rows 0 to reuse an existing DATABASE_URL dataset.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'serialization.db')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, undefer
+
+import json_provider
+from app import create_app
+from datagen import generate_dataset
+from models import (
+    db, Donor, Donation, BloodInventory, DONATION_ROWS, DONOR_ROWS, INVENTORY_ROWS
+)
+
+TABLES = [
+    ('donors', Donor, [undefer(Donor.donation_count)], DONOR_ROWS),
+    ('donations', Donation, [joinedload(Donation.donor)], DONATION_ROWS),
+    ('inventory', BloodInventory, [], INVENTORY_ROWS),
+]
+
+
+def orm_body(model, options, limit, provider):
+    instances = db.session.scalars(select(model).options(*options).limit(limit)).all()
+    return provider.dumps([instance.to_dict() for instance in instances], separators=(',', ':'))
+
+
+def tuple_body(shape, limit, provider):
+    serialize = shape.serializer()
+    rows = db.session.execute(shape.select().limit(limit))
+    return provider.dumps([serialize(row) for row in rows], separators=(',', ':'))
+
+
+def best_seconds(build, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.session.remove()  # no identity map carried between runs
+        started = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        missing = args.rows - Donor.query.count()
+        if missing > 0:
+            print(f'Generating {missing} donors ...', flush=True)
+            started = time.perf_counter()
+            generate_dataset(missing, donations_per_donor=1, seed=7)
+            print(f'  done in {time.perf_counter() - started:.1f}s', flush=True)
+
+        stdlib = DefaultJSONProvider(app)
+        fast = app.json
+        backend = 'orjson' if json_provider.orjson else 'stdlib json'
+        print(f'{args.rows} rows per response, FastJSONProvider backend: {backend}')
+        print(f"{'table':<10} {'path':<6} {'rows/sec':>10} {'ms':>8} {'speedup':>8}")
+        for name, model, options, shape in TABLES:
+            rows = min(args.rows, db.session.scalar(select(db.func.count()).select_from(model)))
+            before = best_seconds(lambda: orm_body(model, options, args.rows, stdlib), args.repeat)
+            after = best_seconds(lambda: tuple_body(shape, args.rows, fast), args.repeat)
+            print(f'{name:<10} {"orm":<6} {rows / before:>10,.0f} {before * 1000:>8.0f}')
+            print(f'{name:<10} {"tuple":<6} {rows / after:>10,.0f} {after * 1000:>8.0f} {before / after:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Statements per burst on the stats endpoints, with and without single-flight.
+
+Usage:
+    python benchmarks/bench_single_flight.py [--clients N] [--bursts N] [--donors N]
+
+Simulates a shift change: --clients threads request /api/dashboard/stats and
+/api/stats at the same moment against a cold cache, --bursts times. Prints
+the SQL statements the database saw per burst and the slowest response,
+once with request coalescing (singleflight.py) and once with every cache
+miss computing on its own. Uses DATABASE_URL when set, otherwise a
+throwaway SQLite file filled with --donors generated donors.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'single_flight.db')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from sqlalchemy import event
+
+from app import create_app
+from cache import get_cache
+from datagen import generate_dataset
+from models import db, Donor
+
+PATHS = ['/api/dashboard/stats', '/api/stats']
+
+
+class NoFlight:
+    """Stand-in for SingleFlight: every caller computes"""
+
+    def do(self, key, compute, timeout=None):
+        return compute()
+
+
+def burst(app, client, clients):
+    with app.app_context():
+        get_cache().clear()
+    start = threading.Barrier(clients)
+    slowest = []
+
+    def run(path):
+        start.wait()
+        started = time.perf_counter()
+        client.get(path)
+        slowest.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=run, args=(PATHS[i % len(PATHS)],)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return max(slowest)
+
+
+def measure(app, client, clients, bursts):
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        slowest = max(burst(app, client, clients) for _ in range(bursts))
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return statements[0] / bursts, slowest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--bursts', type=int, default=5)
+    parser.add_argument('--donors', type=int, default=20000)
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        missing = args.donors - Donor.query.count()
+        if missing > 0:
+            generate_dataset(missing, donations_per_donor=2, seed=7)
+
+    print(f'{args.clients} concurrent clients per burst over {PATHS}')
+    print(f"{'mode':<14} {'statements/burst':>17} {'slowest ms':>11}")
+    coalesced = app.extensions['hemobank_single_flight']
+    for mode, flight in (('single-flight', coalesced), ('per-request', NoFlight())):
+        app.extensions['hemobank_single_flight'] = flight
+        statements, slowest = measure(app, client, args.clients, args.bursts)
+        print(f'{mode:<14} {statements:>17.1f} {slowest * 1000:>11.0f}')
+    app.extensions['hemobank_single_flight'] = coalesced
+
+
+if __name__ == '__main__':
+    main()
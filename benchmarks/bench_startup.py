@@ -0,0 +1,63 @@
+"""Benchmark worker boot: `import wsgi` time and database round-trips.
+
+Usage:
+    python benchmarks/bench_startup.py [runs]
+
+Imports wsgi.py in fresh interpreters (default 5 runs each) with
+AUTO_INIT_DB on and off, and reports the median boot time together with
+how many DB connections were opened and statements executed during boot.
+With AUTO_INIT_DB=0 both counts should be zero. Uses DATABASE_URL when
+set, otherwise a throwaway SQLite file (prepared once with `flask db-init`).
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child: count pool connects and statements, then import wsgi
+CHILD = """
+import json, sys, time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+counts = {'connects': 0, 'statements': 0}
+event.listen(Pool, 'connect', lambda *a: counts.__setitem__('connects', counts['connects'] + 1))
+event.listen(Engine, 'before_cursor_execute',
+             lambda *a: counts.__setitem__('statements', counts['statements'] + 1))
+started = time.perf_counter()
+import wsgi
+counts['seconds'] = time.perf_counter() - started
+sys.stdout.write('\\n' + json.dumps(counts))
+"""
+
+
+def boot(env):
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(runs):
+    env = dict(os.environ, SQLALCHEMY_SILENCE_UBER_WARNING='1')
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'startup.db'))
+    subprocess.run(
+        [sys.executable, '-m', 'flask', '--app', 'wsgi', 'db-init'],
+        cwd=ROOT, env=dict(env, AUTO_INIT_DB='0'), capture_output=True, check=True
+    )
+
+    print(f"{'AUTO_INIT_DB':>12} {'median ms':>10} {'connects':>9} {'statements':>11}")
+    for flag in ('1', '0'):
+        results = [boot(dict(env, AUTO_INIT_DB=flag)) for _ in range(runs)]
+        median = statistics.median(r['seconds'] for r in results) * 1000
+        print(f"{flag:>12} {median:>10.1f} {max(r['connects'] for r in results):>9} "
+              f"{max(r['statements'] for r in results):>11}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
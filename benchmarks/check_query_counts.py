@@ -0,0 +1,101 @@
+"""Check that list endpoints issue a constant number of SQL statements.
+
+Usage:
+    python benchmarks/check_query_counts.py
+
+Counts statements per request against a small and a larger dataset (fresh
+SQLite file unless DATABASE_URL is set) and exits non-zero if any list
+endpoint's count grows with the number of rows, i.e. an N+1 crept back in.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'queries.db')
+
+from sqlalchemy import event
+
+from app import create_app
+from models import db, Donor, Donation, BloodInventory, BLOOD_TYPES
+
+ENDPOINTS = [
+    '/api/donors',
+    '/api/donors?limit=20',
+    '/api/donations',
+    '/api/donations?limit=20',
+    '/api/inventory',
+    '/api/inventory?limit=20',
+]
+
+
+def add_donors(count, donations_each=2):
+    start = Donor.query.count()
+    now = datetime.utcnow()
+    for i in range(start, start + count):
+        donor = Donor(
+            name=f'Donor {i}',
+            age=30,
+            email=f'donor{i}@example.com',
+            phone=f'{7000000000 + i}',
+            blood_type=BLOOD_TYPES[i % len(BLOOD_TYPES)],
+        )
+        for d in range(donations_each):
+            donated = now - timedelta(days=d)
+            donation = Donation(
+                donation_date=donated,
+                quantity_ml=450,
+                hemoglobin=13.5,
+                blood_pressure='120/80',
+            )
+            donation.blood_inventory.append(BloodInventory(
+                blood_type=donor.blood_type,
+                donation_date=donated,
+            ))
+            donor.donations.append(donation)
+        db.session.add(donor)
+    db.session.commit()
+
+
+def statement_counts(client):
+    counts = {}
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        for url in ENDPOINTS:
+            statements.clear()
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+            counts[url] = len(statements)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return counts
+
+
+def main():
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        db.engine.echo = False
+        add_donors(5)
+        small = statement_counts(client)
+        add_donors(100)
+        large = statement_counts(client)
+
+    failed = False
+    for url in ENDPOINTS:
+        ok = small[url] == large[url]
+        failed = failed or not ok
+        print(f"{'ok' if ok else 'FAIL':>4}  {url:<28} {small[url]:>3} -> {large[url]:>3} statements")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""EXPLAIN the hot read queries on a seeded dataset and fail on full scans.
+
+Usage:
+    python benchmarks/explain_hot_paths.py [inventory_rows]
+
+Seeds donors, donations and inventory (default 200k inventory rows) into
+DATABASE_URL or a throwaway SQLite file, runs ANALYZE and the schema
+migrations, then EXPLAINs the statements behind the hot endpoints. Exits
+non-zero if any of them reads a guarded table with a sequential scan
+(PostgreSQL "Seq Scan on t", SQLite "SCAN t" without an index).
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'explain.db')
+
+from sqlalchemy import func, select
+
+from aggregates import EXPIRING_SOON_DAYS, inventory_breakdown_query
+from allocation import COMPATIBLE_DONORS
+from app import create_app
+from expiry import inventory_table
+from inventory_summary import rebuild_summary
+from migrations import upgrade
+from models import db, Donor, Donation, BloodInventory, BLOOD_TYPES
+
+CHUNK = 10000
+STATUSES = ['available'] * 2 + ['used'] * 6 + ['expired'] * 2
+
+
+def seed(inventory_rows):
+    if BloodInventory.query.count() >= inventory_rows:
+        return
+    now = datetime.utcnow()
+    donors = inventory_rows // 4
+    start = db.session.query(func.coalesce(func.max(Donor.id), 0)).scalar()
+
+    for offset in range(0, donors, CHUNK):
+        db.session.execute(Donor.__table__.insert(), [{
+            'id': start + i + 1,
+            'name': f'Donor {start + i}',
+            'age': 30,
+            'email': f'explain{start + i}@example.com',
+            'phone': f'{6000000000 + start + i}',
+            'blood_type': random.choice(BLOOD_TYPES),
+            'registered_on': now - timedelta(days=random.randint(0, 2000)),
+            'created_at': now,
+            'updated_at': now,
+        } for i in range(offset, min(offset + CHUNK, donors))])
+
+    for offset in range(0, inventory_rows, CHUNK):
+        batch = range(offset, min(offset + CHUNK, inventory_rows))
+        donated = [now - timedelta(days=random.randint(0, 720)) for _ in batch]
+        donation_rows = [{
+            'id': i + 1,
+            'donor_id': start + random.randint(1, donors),
+            'donation_date': when,
+            'quantity_ml': 450,
+            'hemoglobin': 13.5,
+            'blood_pressure': '120/80',
+            'recorded_at': when,
+            'created_at': when,
+            'updated_at': when,
+        } for i, when in zip(batch, donated)]
+        db.session.execute(Donation.__table__.insert(), donation_rows)
+        db.session.execute(inventory_table.insert(), [{
+            'blood_type': random.choice(BLOOD_TYPES),
+            'quantity_ml': 450,
+            'donation_id': row['id'],
+            'donation_date': row['donation_date'],
+            'expiry_date': row['donation_date'] + timedelta(days=35),
+            'status': random.choice(STATUSES),
+            'added_at': row['donation_date'],
+            'created_at': row['donation_date'],
+            'updated_at': row['donation_date'],
+        } for row in donation_rows])
+        db.session.commit()
+
+    rebuild_summary(db.session)
+    db.session.commit()
+
+
+def hot_queries(now):
+    """(name, statement, tables that must not be sequentially scanned)"""
+    threshold = now + timedelta(days=EXPIRING_SOON_DAYS)
+    return [
+        ('GET /api/inventory?limit=50',
+         BloodInventory.query.filter_by(status='available')
+         .order_by(BloodInventory.expiry_date, BloodInventory.id).limit(51).statement,
+         ['blood_inventory']),
+        ('GET /api/inventory/blood-type/O-',
+         BloodInventory.query.filter_by(blood_type='O-', status='available').statement,
+         ['blood_inventory']),
+        ('GET /api/dashboard/stats',
+         inventory_breakdown_query(threshold),
+         ['blood_inventory']),
+        ('POST /api/inventory/allocate (AB-)',
+         select(BloodInventory.id).where(
+             BloodInventory.blood_type.in_(COMPATIBLE_DONORS['AB-']),
+             BloodInventory.status == 'available',
+             BloodInventory.expiry_date > now
+         ).order_by(BloodInventory.expiry_date, BloodInventory.id).limit(4),
+         ['blood_inventory']),
+        ('expiry sweep batch',
+         select(inventory_table.c.id).where(
+             inventory_table.c.status == 'available',
+             inventory_table.c.expiry_date < now
+         ).order_by(inventory_table.c.expiry_date).limit(1000),
+         ['blood_inventory']),
+        ('GET /api/donations/donor/<id>',
+         Donation.query.filter_by(donor_id=42).order_by(Donation.donation_date).statement,
+         ['donations']),
+        ('GET /api/donors?limit=50',
+         Donor.query.order_by(Donor.registered_on, Donor.id).limit(51).statement,
+         ['donors']),
+    ]
+
+
+def explain(connection, statement):
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).all()
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql('EXPLAIN ' + str(compiled), params).all()
+    return [row[0] for row in rows]
+
+
+def full_scans(plan, tables, dialect):
+    found = []
+    for line in plan:
+        for table in tables:
+            if dialect == 'sqlite':
+                if re.search(rf'\bSCAN {table}\b(?! USING)', line):
+                    found.append(line.strip())
+            elif re.search(rf'Seq Scan on {table}\b', line):
+                found.append(line.strip())
+    return found
+
+
+def main(inventory_rows):
+    app = create_app()
+    with app.app_context():
+        db.engine.echo = False
+        seed(inventory_rows)
+        upgrade(db.engine)
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('ANALYZE')
+            connection.commit()
+
+            failed = False
+            for name, statement, tables in hot_queries(datetime.utcnow()):
+                plan = explain(connection, statement)
+                scans = full_scans(plan, tables, connection.dialect.name)
+                failed = failed or bool(scans)
+                print(f"{'FAIL' if scans else 'ok':>4}  {name}")
+                for line in scans:
+                    print(f'        {line}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000))
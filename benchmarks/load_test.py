@@ -0,0 +1,213 @@
+"""Drive every GET /api/* endpoint at fixed concurrency and report latency.
+
+Usage:
+    python benchmarks/load_test.py [--donors N] [--requests N] [--concurrency N]
+                                   [--save FILE] [--compare FILE] [--tolerance F]
+                                   [--min-delta-ms MS]
+
+Generates a synthetic dataset (datagen.py) into DATABASE_URL or a throwaway
+SQLite file, then for each endpoint issues --requests requests from
+--concurrency threads through the WSGI app and prints p50/p95/p99 latency,
+throughput and SQL statements per request. --save writes the results as a
+JSON baseline; --compare exits non-zero when an endpoint's p95 is more than
+--tolerance (and at least --min-delta-ms) slower than the baseline, or it
+issues more queries per request.
+
+/api/export/*, /api/donors/eligible and /api/inventory/stream are left
+out: they stream (whole tables, recall lists, live events) and are not
+request/response endpoints.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'load.db')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+
+from app import create_app
+from datagen import generate_dataset
+from models import db, Donor, Donation, BloodInventory, BLOOD_TYPES
+
+# Path templates; {donor}, {donation}, {unit} and {blood_type} are filled per request
+ENDPOINTS = [
+    '/api/health',
+    '/api/stats',
+    '/api/dashboard/stats',
+    '/api/forecast',
+    '/api/donors?limit=50',
+    '/api/donors/search?q=Donor%20{donor}&limit=20',
+    '/api/donors/{donor}',
+    '/api/donors/{donor}/can-donate',
+    '/api/donors/eligible/counts?blood_type=O-',
+    '/api/donations?limit=50',
+    '/api/donations/{donation}',
+    '/api/donations/donor/{donor}',
+    '/api/inventory?limit=50',
+    '/api/inventory/{unit}',
+    '/api/inventory/blood-type/{blood_type}',
+    '/api/inventory/expiry-sweep',
+]
+EXCLUDED_PREFIXES = ('/api/export', '/api/donors/eligible', '/api/inventory/stream')
+SAMPLE_IDS = 1000
+
+_local = threading.local()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_statement(*args):
+    _local.statements = getattr(_local, 'statements', 0) + 1
+
+
+def ensure_dataset(donors):
+    missing = donors - Donor.query.count()
+    if missing > 0:
+        print(f'Generating {missing} donors ...', flush=True)
+        started = time.perf_counter()
+        counts = generate_dataset(missing, seed=42)
+        print(f'  {counts} in {time.perf_counter() - started:.1f}s', flush=True)
+
+
+def sample_ids(model):
+    ids = db.session.scalars(select(model.id).order_by(model.id).limit(SAMPLE_IDS)).all()
+    return ids or [1]
+
+
+def uncovered_routes(app):
+    covered = {template.split('?')[0].split('{')[0].rstrip('/') for template in ENDPOINTS}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        path = rule.rule
+        if 'GET' not in rule.methods or not path.startswith('/api') or path.startswith(EXCLUDED_PREFIXES):
+            continue
+        if path.split('<')[0].rstrip('/') not in covered:
+            missing.append(path)
+    return missing
+
+
+def percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_endpoint(app, template, ids, requests, concurrency):
+    def one(_):
+        client = getattr(_local, 'client', None)
+        if client is None:
+            client = _local.client = app.test_client()
+        path = template.format(
+            donor=random.choice(ids['donor']),
+            donation=random.choice(ids['donation']),
+            unit=random.choice(ids['unit']),
+            blood_type=random.choice(BLOOD_TYPES).replace('+', '%2B')
+        )
+        _local.statements = 0
+        started = time.perf_counter()
+        response = client.get(path)
+        response.get_data()
+        return time.perf_counter() - started, _local.statements, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(r[0] for r in results)
+    return {
+        'requests': requests,
+        'errors': sum(1 for r in results if r[2] >= 500),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'rps': round(requests / wall, 1),
+        'queries_per_request': round(sum(r[1] for r in results) / requests, 2),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    regressions = []
+    for endpoint, result in results.items():
+        before = baseline.get(endpoint)
+        if before is None:
+            continue
+        slower = result['p95_ms'] - before['p95_ms']
+        if slower > before['p95_ms'] * tolerance and slower > min_delta_ms:
+            regressions.append(f"{endpoint}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result['queries_per_request'] > before['queries_per_request']:
+            regressions.append(
+                f"{endpoint}: queries/request {before['queries_per_request']} -> {result['queries_per_request']}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--donors', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--save', metavar='FILE')
+    parser.add_argument('--compare', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    # Sub-millisecond endpoints are noisy; ignore p95 changes smaller than this
+    parser.add_argument('--min-delta-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        ensure_dataset(args.donors)
+        ids = {
+            'donor': sample_ids(Donor),
+            'donation': sample_ids(Donation),
+            'unit': sample_ids(BloodInventory),
+        }
+    for path in uncovered_routes(app):
+        print(f'warning: {path} is not covered by ENDPOINTS')
+
+    results = {}
+    print(f"{'endpoint':<42} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'q/req':>6} {'5xx':>4}")
+    for template in ENDPOINTS:
+        # One untimed request warms caches and the connection pool
+        run_endpoint(app, template, ids, 1, 1)
+        result = results[template] = run_endpoint(app, template, ids, args.requests, args.concurrency)
+        print(f"{template:<42} {result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8} "
+              f"{result['rps']:>8} {result['queries_per_request']:>6} {result['errors']:>4}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'created_at': datetime.utcnow().isoformat(),
+                'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0],
+                'python': platform.python_version(),
+                'donors': args.donors,
+                'concurrency': args.concurrency,
+                'results': results,
+            }, f, indent=2)
+        print(f'Saved baseline to {args.save}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            return 1
+        print(f'No regressions against {args.compare}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db
+from routing import reads_from_replica
+from singleflight import SingleFlight, shared
+
+DASHBOARD_STATS = 'dashboard_stats'
+DB_STATS = 'db_stats'
+STATS_KEYS = (DASHBOARD_STATS, DB_STATS)
+# Invalidated by inventory_summary.record_deltas and versioned by the
+# inventory table, so it can live much longer
+FORECAST = 'forecast'
+
+_PENDING_KEY = 'cache_invalidations'
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Each key carries a generation number that `invalidate` bumps, so a value
+    computed from data read before an invalidation is never stored after it.
+    The cache is per process: under gunicorn, other workers see a write only
+    once their own entry's TTL runs out.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._invalidated_at = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def generation(self, key):
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def invalidated_at(self, key):
+        """UTC wall-clock time of the last invalidation of `key`, or None"""
+        with self._lock:
+            return self._invalidated_at.get(key)
+
+    def set(self, key, value, generation=None, ttl=None):
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key, 0):
+                return
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            now = datetime.utcnow()
+            for key in keys:
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._invalidated_at[key] = now
+
+    def clear(self):
+        with self._lock:
+            now = datetime.utcnow()
+            for key in self._entries:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._invalidated_at[key] = now
+            self._entries.clear()
+
+
+def init_cache(app):
+    app.extensions['hemobank_cache'] = TTLCache(
+        app.config['STATS_CACHE_TTL'],
+        app.config['STATS_CACHE_MAX_ENTRIES']
+    )
+    app.extensions['hemobank_single_flight'] = SingleFlight()
+
+
+def get_cache():
+    return current_app.extensions['hemobank_cache']
+
+
+def cache_slot(key, replica):
+    """Cache key for `key` read from the replica or the primary.
+
+    Kept apart so a value read on a lagging replica is never served to a
+    client pinned to the primary by its own write (routing.py).
+    """
+    return (key, bool(replica))
+
+
+def cached(key, compute, ttl=None, version=None):
+    """Return the cached value for `key`, computing and storing it on a miss.
+
+    Concurrent misses share one compute() (singleflight.py); with
+    SINGLE_FLIGHT_SHARED, so do misses in other workers.
+
+    `version` is an optional stamp of the rows the value is computed from
+    (see conditional.version_etag), read by the caller just before. An entry
+    stored at another version is a miss, so writes committed through other
+    workers, which never reach this worker's invalidate(), are still seen.
+    """
+    cache = get_cache()
+    replica = reads_from_replica(db.session)
+    slot = cache_slot(key, replica)
+    entry = cache.get(slot, _MISSING)
+    if entry is not _MISSING and entry[0] == version:
+        return entry[1]
+
+    generation = cache.generation(slot)
+    config = current_app.config
+
+    def fill():
+        if config['SINGLE_FLIGHT_SHARED']:
+            value, age = shared(
+                db.engine, f'{key}:replica' if replica else key, compute, ttl or cache.ttl,
+                cache.invalidated_at(slot), config['SINGLE_FLIGHT_TIMEOUT'], version
+            )
+        else:
+            value, age = compute(), 0.0
+        # A snapshot from another worker only lives out the rest of its TTL
+        cache.set(slot, (version, value), generation, (ttl or cache.ttl) - age)
+        return value
+
+    # A read after a write never joins a flight started before it, or one
+    # reading from the replica
+    flight = (slot, generation, version)
+    return current_app.extensions['hemobank_single_flight'].do(
+        flight, fill, config['SINGLE_FLIGHT_TIMEOUT']
+    )
+
+
+def invalidate_on_commit(session, *keys):
+    """Drop `keys` from the cache once `session`'s transaction commits"""
+    session.info.setdefault(_PENDING_KEY, set()).update(keys)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    keys = session.info.pop(_PENDING_KEY, None)
+    if keys and has_app_context() and 'hemobank_cache' in current_app.extensions:
+        get_cache().invalidate(*(cache_slot(key, replica) for key in keys for replica in (False, True)))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
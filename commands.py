@@ -0,0 +1,63 @@
+import click
+
+from models import db
+from database import init_db, seed_sample_data
+from datagen import BLOOD_TYPE_DISTRIBUTION, generate_dataset, parse_distribution
+from expiry import sweep_expired
+from inventory_summary import rebuild_summary
+from migrations import upgrade
+
+
+def register_commands(app):
+
+    @app.cli.command('db-init')
+    def db_init():
+        """Create missing tables and apply pending migrations."""
+        applied = init_db(app)
+        click.echo('✓ Database initialized')
+        for version in applied:
+            click.echo(f'✓ Applied {version}')
+
+    @app.cli.command('seed')
+    def seed():
+        """Add the sample donors to an empty database."""
+        added = seed_sample_data(app)
+        click.echo(f'✓ Added {added} sample donors' if added else '✓ Sample data already exists')
+
+    @app.cli.command('generate-data')
+    @click.option('--donors', default=100000, show_default=True, help='Donors to add.')
+    @click.option('--donations', default=3, show_default=True, help='Mean donations per donor.')
+    @click.option('--distribution', default=None,
+                  help='Blood type weights, e.g. "O+=0.4,A+=0.3,B+=0.3".')
+    @click.option('--seed', default=None, type=int, help='Random seed for repeatable data.')
+    def generate_data(donors, donations, distribution, seed):
+        """Bulk-load synthetic donors, donations and inventory."""
+        try:
+            weights = parse_distribution(distribution) if distribution else BLOOD_TYPE_DISTRIBUTION
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--distribution')
+        counts = generate_dataset(donors, donations, weights, seed)
+        click.echo('✓ Added ' + ', '.join(f'{n} {table}' for table, n in counts.items()))
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade():
+        """Apply pending schema migrations (indexes on existing tables)."""
+        applied = upgrade(db.engine)
+        for version in applied:
+            click.echo(f'✓ Applied {version}')
+        if not applied:
+            click.echo('✓ Schema is up to date')
+
+    @app.cli.command('reconcile-inventory')
+    def reconcile_inventory():
+        """Rebuild inventory_summary from blood_inventory."""
+        rows = rebuild_summary(db.session)
+        db.session.commit()
+        click.echo(f'✓ Rebuilt inventory summary ({rows} rows)')
+
+    @app.cli.command('expire-units')
+    @click.option('--batch-size', default=None, type=int, help='Units updated per batch.')
+    def expire_units(batch_size):
+        """Mark available units past their expiry date as expired."""
+        expired = sweep_expired(db.session, batch_size or app.config['EXPIRY_SWEEP_BATCH_SIZE'])
+        click.echo(f'✓ Marked {expired} units as expired')
@@ -0,0 +1,56 @@
+"""gzip / brotli compression for large API and page responses.
+
+Buffered responses of COMPRESS_MIN_BYTES or more are compressed with the
+best encoding the client accepts (brotli when the package is installed).
+Streamed responses (CSV exports, the SSE inventory stream) and file
+downloads are left alone so they keep flushing as they are produced.
+"""
+import gzip
+
+from flask import request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'
+}
+# Dynamic content: favour speed over the last few percent of ratio
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def choose_encoding(accept_encoding):
+    """Best of br/gzip allowed by an Accept-Encoding header, or None"""
+    offers = ['br', 'gzip'] if brotli else ['gzip']
+    return parse_accept_header(accept_encoding).best_match(offers)
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def init_compression(app):
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        body = response.get_data()
+        if encoding is None or len(body) < app.config['COMPRESS_MIN_BYTES']:
+            return response
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        # The bytes differ per encoding, so a strong validator no longer holds
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,99 @@
+"""ETag validators and 304 responses for the read APIs.
+
+List endpoints derive their ETag from one COUNT(*) / MAX(updated_at) query
+over the tables the payload is built from (updated_at is indexed on all
+three), so a request whose If-None-Match still matches gets its 304 before
+a single row is loaded or serialized. Inserts and deletes move the count;
+ORM updates and the expiry sweep move MAX(updated_at). No Last-Modified is
+sent: MAX(updated_at) alone does not move on a delete, so If-Modified-Since
+would answer 304 for a stale list.
+
+A write whose transaction commits after a newer one, carrying an older
+updated_at, moves neither; clients pick it up with the next change to the
+table or, for clock-dependent payloads, the next time window.
+
+Cached stats payloads are cheap to serialize, so they are hashed instead.
+"""
+import hashlib
+import logging
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request
+from sqlalchemy import func, select
+from werkzeug.http import quote_etag
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+
+def version_query(*models):
+    """One row of (count, max(updated_at)) pairs, one pair per model"""
+    columns = []
+    for model in models:
+        columns.append(select(func.count()).select_from(model).scalar_subquery())
+        columns.append(select(func.max(model.updated_at)).scalar_subquery())
+    return select(*columns)
+
+
+def version_etag(row, full_path, time_window=None):
+    """ETag for a version_query row and request path.
+
+    With `time_window` seconds the ETag also rolls over once per window, for
+    payloads computed against the clock (days_until_expiry and the like).
+    """
+    state = [full_path, *row]
+    if time_window:
+        state.append(int(time.time() // time_window))
+    return hashlib.sha1(repr(state).encode()).hexdigest()
+
+
+def is_not_modified(if_none_match, etag):
+    """If-None-Match with weak comparison (RFC 9110)"""
+    return bool(if_none_match) and if_none_match.contains_weak(etag)
+
+
+def validator_headers(etag, weak=False):
+    return {'ETag': quote_etag(etag, weak), 'Cache-Control': 'no-cache'}
+
+
+def table_etag(*models, clock=False):
+    """Conditional GET for a view whose payload is built from `models`' rows.
+
+    `clock=True` marks payloads that also change with time; their validators
+    roll over every ETAG_TIME_WINDOW seconds and are weak.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                row = db.session.execute(version_query(*models)).one()
+            except Exception:
+                logger.exception('Could not read table versions for %s', request.path)
+                return view(*args, **kwargs)
+            time_window = current_app.config['ETAG_TIME_WINDOW'] if clock else None
+            etag = version_etag(row, request.full_path, time_window)
+            if is_not_modified(request.if_none_match, etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.headers.update(validator_headers(etag, weak=clock))
+            return response
+        return wrapper
+    return decorator
+
+
+def body_etag(view):
+    """Conditional GET for small (cached) payloads: ETag is a hash of the body"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+        response.add_etag()
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    return wrapper
@@ -1,18 +1,29 @@
-from models import db, Donor, Donation, BloodInventory
+from models import db, Donor, Donation, InventorySummary
+from inventory_summary import rebuild_summary, summary_needs_rebuild
+from migrations import upgrade
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 def init_db(app):
-    """Initialize database"""
+    """Create missing tables and apply pending migrations; returns the versions applied"""
     with app.app_context():
         db.create_all()
-        print("✓ Database initialized successfully!")
+        if summary_needs_rebuild(db.session):
+            rebuild_summary(db.session)
+        db.session.commit()
+        # Indexes create_all() leaves out, e.g. the donor search index
+        applied = upgrade(db.engine)
+        logger.info("Database initialized")
+    return applied
 
 def seed_sample_data(app):
     """Add sample data for testing"""
     with app.app_context():
         if Donor.query.first() is not None:
-            print("✓ Sample data already exists!")
-            return
+            logger.info("Sample data already exists")
+            return 0
         
         donors = [
             Donor(
@@ -48,7 +59,8 @@ def seed_sample_data(app):
             db.session.add(donor)
         
         db.session.commit()
-        print(f"✓ Added {len(donors)} sample donors!")
+        logger.info("Added %d sample donors", len(donors))
+        return len(donors)
 
 def get_db_stats(app):
     """Get database statistics for DBMS project"""
@@ -56,18 +68,20 @@ def get_db_stats(app):
         stats = {
             'total_donors': Donor.query.count(),
             'total_donations': Donation.query.count(),
-            'total_blood_units': BloodInventory.query.count(),
+            'total_blood_units': 0,
             'blood_by_type': {},
             'donors_by_blood_type': {}
         }
         
         from sqlalchemy import func
+        # Unit counts come from the maintained counters, not blood_inventory
         blood_stats = db.session.query(
-            BloodInventory.blood_type,
-            func.count(BloodInventory.id).label('count')
-        ).group_by(BloodInventory.blood_type).all()
+            InventorySummary.blood_type,
+            func.sum(InventorySummary.units).label('count')
+        ).group_by(InventorySummary.blood_type).all()
         
-        stats['blood_by_type'] = {bt: cnt for bt, cnt in blood_stats}
+        stats['blood_by_type'] = {bt: int(cnt) for bt, cnt in blood_stats if cnt}
+        stats['total_blood_units'] = sum(stats['blood_by_type'].values())
         
         donor_stats = db.session.query(
             Donor.blood_type,
@@ -0,0 +1,192 @@
+"""Synthetic dataset generator for load tests and benchmarks.
+
+Bulk-loads donors with donation histories and the matching inventory units.
+On PostgreSQL rows are streamed with COPY; elsewhere they go through
+executemany inserts. Ids continue from the current maxima, so generating
+into a non-empty database appends. inventory_summary is rebuilt at the end.
+"""
+import csv
+import io
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from inventory_summary import rebuild_summary
+from models import (
+    db, Donor, Donation, BloodInventory, BLOOD_TYPES, DONATION_INTERVAL_DAYS, SHELF_LIFE_DAYS
+)
+
+# Approximate share of each blood type in the donor population
+BLOOD_TYPE_DISTRIBUTION = {
+    'O+': 0.38, 'A+': 0.34, 'B+': 0.09, 'O-': 0.07,
+    'A-': 0.06, 'AB+': 0.03, 'B-': 0.02, 'AB-': 0.01,
+}
+CHUNK = 10000
+HISTORY_DAYS = 3 * 365
+# Share of units past their shelf life that were transfused rather than expired
+USED_SHARE = 0.85
+
+DONOR_COLUMNS = [
+    'id', 'name', 'age', 'email', 'phone', 'blood_type', 'address',
+    'emergency_contact', 'registered_on', 'last_donation', 'created_at', 'updated_at'
+]
+DONATION_COLUMNS = [
+    'id', 'donor_id', 'donation_date', 'quantity_ml', 'hemoglobin',
+    'blood_pressure', 'notes', 'recorded_at', 'created_at', 'updated_at'
+]
+INVENTORY_COLUMNS = [
+    'id', 'blood_type', 'quantity_ml', 'donation_id', 'donation_date', 'expiry_date',
+    'status', 'added_at', 'used_at', 'created_at', 'updated_at'
+]
+
+
+def parse_distribution(text):
+    """'O+=0.4,A+=0.3,...' -> {blood_type: weight}; unlisted types get 0"""
+    distribution = dict.fromkeys(BLOOD_TYPES, 0.0)
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        blood_type, _, weight = part.partition('=')
+        if blood_type not in distribution:
+            raise ValueError(f'Unknown blood type: {blood_type}')
+        distribution[blood_type] = float(weight)
+    if sum(distribution.values()) <= 0:
+        raise ValueError('Distribution weights must sum to more than 0')
+    return distribution
+
+
+def _max_id(connection, model):
+    return connection.execute(select(func.coalesce(func.max(model.id), 0))).scalar()
+
+
+def _copy(connection, table, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['\\N' if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    cursor.copy_expert(
+        f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+        buffer
+    )
+
+
+def _load(connection, model, columns, rows):
+    if not rows:
+        return
+    if connection.dialect.name == 'postgresql':
+        _copy(connection, model.__table__, columns, rows)
+    else:
+        connection.execute(model.__table__.insert(), rows)
+
+
+def _reset_sequences(connection):
+    for table in ('donors', 'donations', 'blood_inventory'):
+        connection.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        )
+
+
+def _history(rng, now, donations_per_donor):
+    """Donation dates for one donor, oldest first, at least 90 days apart"""
+    count = min(rng.randint(0, 2 * donations_per_donor), HISTORY_DAYS // DONATION_INTERVAL_DAYS)
+    dates = []
+    when = now - timedelta(days=rng.randint(0, HISTORY_DAYS))
+    for _ in range(count):
+        if when > now:
+            break
+        dates.append(when)
+        when += timedelta(days=DONATION_INTERVAL_DAYS + rng.randint(0, 180))
+    return dates
+
+
+def generate(connection, donors, donations_per_donor=3, distribution=None, seed=None, chunk=CHUNK):
+    """Insert `donors` donors plus histories; returns row counts per table.
+
+    `donations_per_donor` is the mean history length. The caller commits.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    distribution = distribution or BLOOD_TYPE_DISTRIBUTION
+    types, weights = zip(*distribution.items())
+
+    donor_id = _max_id(connection, Donor)
+    donation_id = _max_id(connection, Donation)
+    inventory_id = _max_id(connection, BloodInventory)
+    counts = {'donors': 0, 'donations': 0, 'blood_inventory': 0}
+
+    for offset in range(0, donors, chunk):
+        donor_rows, donation_rows, inventory_rows = [], [], []
+        for blood_type in rng.choices(types, weights, k=min(chunk, donors - offset)):
+            donor_id += 1
+            history = _history(rng, now, donations_per_donor)
+            registered = (history[0] if history else now) - timedelta(days=rng.randint(0, 30))
+            donor_rows.append({
+                'id': donor_id,
+                'name': f'Donor {donor_id}',
+                'age': rng.randint(18, 65),
+                'email': f'donor{donor_id}@example.com',
+                'phone': f'{7000000000 + donor_id}',
+                'blood_type': blood_type,
+                'address': f'{rng.randint(1, 999)} Test Street',
+                'emergency_contact': f'{8000000000 + donor_id}',
+                'registered_on': registered,
+                'last_donation': history[-1] if history else None,
+                'created_at': registered,
+                'updated_at': registered,
+            })
+            for donated in history:
+                donation_id += 1
+                inventory_id += 1
+                expiry = donated + timedelta(days=SHELF_LIFE_DAYS)
+                if expiry > now:
+                    status, used_at = 'available', None
+                elif rng.random() < USED_SHARE:
+                    status, used_at = 'used', donated + timedelta(days=rng.randint(1, SHELF_LIFE_DAYS))
+                else:
+                    status, used_at = 'expired', None
+                donation_rows.append({
+                    'id': donation_id,
+                    'donor_id': donor_id,
+                    'donation_date': donated,
+                    'quantity_ml': 450,
+                    'hemoglobin': round(rng.uniform(12.5, 17.5), 1),
+                    'blood_pressure': f'{rng.randint(105, 135)}/{rng.randint(65, 88)}',
+                    'notes': '',
+                    'recorded_at': donated,
+                    'created_at': donated,
+                    'updated_at': donated,
+                })
+                inventory_rows.append({
+                    'id': inventory_id,
+                    'blood_type': blood_type,
+                    'quantity_ml': 450,
+                    'donation_id': donation_id,
+                    'donation_date': donated,
+                    'expiry_date': expiry,
+                    'status': status,
+                    'added_at': donated,
+                    'used_at': used_at,
+                    'created_at': donated,
+                    'updated_at': used_at or donated,
+                })
+
+        _load(connection, Donor, DONOR_COLUMNS, donor_rows)
+        _load(connection, Donation, DONATION_COLUMNS, donation_rows)
+        _load(connection, BloodInventory, INVENTORY_COLUMNS, inventory_rows)
+        counts['donors'] += len(donor_rows)
+        counts['donations'] += len(donation_rows)
+        counts['blood_inventory'] += len(inventory_rows)
+
+    if connection.dialect.name == 'postgresql':
+        _reset_sequences(connection)
+    return counts
+
+
+def generate_dataset(donors, donations_per_donor=3, distribution=None, seed=None):
+    """Generate into db.session's connection, rebuild the summary and commit"""
+    counts = generate(db.session.connection(), donors, donations_per_donor, distribution, seed)
+    rebuild_summary(db.session)
+    db.session.commit()
+    return counts
@@ -0,0 +1,58 @@
+"""Set-based donor eligibility (the 90-day rule) for recall campaigns.
+
+Donor.can_donate() answers for one loaded donor. The queries here apply the
+same rule (Donor.eligible_clause) in SQL over
+ix_donors_blood_type_last_donation, so a recall list or per-type counts for
+a shortage come from one index range scan per blood type.
+"""
+from datetime import datetime, time
+
+from sqlalchemy import func, select
+
+from models import db, Donor, BLOOD_TYPES
+
+RECALL_COLUMNS = ['id', 'name', 'email', 'phone', 'blood_type', 'last_donation']
+
+
+def parse_blood_types(values):
+    """Blood types from repeated and/or comma-separated args; all types if none"""
+    blood_types = [bt.strip() for value in values for bt in value.split(',') if bt.strip()]
+    unknown = [bt for bt in blood_types if bt not in BLOOD_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown blood types: {', '.join(unknown)}")
+    return list(dict.fromkeys(blood_types)) or list(BLOOD_TYPES)
+
+
+def eligible_at(on=None):
+    """When to evaluate the rule: the end of day `on` (YYYY-MM-DD), or now"""
+    if not on:
+        return datetime.utcnow()
+    try:
+        return datetime.combine(datetime.strptime(on, '%Y-%m-%d').date(), time.max)
+    except ValueError:
+        raise ValueError('on must be a date (YYYY-MM-DD)')
+
+
+def eligible_donors(blood_types, at):
+    """select() of RECALL_COLUMNS for donors of `blood_types` who can donate at `at`.
+
+    Ordered by blood type, then longest since their last donation (never
+    donated first).
+    """
+    return (
+        select(*[getattr(Donor, key) for key in RECALL_COLUMNS])
+        .where(Donor.blood_type.in_(blood_types), Donor.eligible_clause(at))
+        .order_by(Donor.blood_type, Donor.last_donation.asc().nulls_first(), Donor.id)
+    )
+
+
+def eligible_counts(blood_types, at):
+    """{blood_type: donors who can donate at `at`} for each of `blood_types`"""
+    rows = db.session.execute(
+        select(Donor.blood_type, func.count())
+        .where(Donor.blood_type.in_(blood_types), Donor.eligible_clause(at))
+        .group_by(Donor.blood_type)
+    ).all()
+    counts = dict.fromkeys(blood_types, 0)
+    counts.update({blood_type: count for blood_type, count in rows})
+    return counts
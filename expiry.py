@@ -0,0 +1,144 @@
+"""Expiry sweeper: flips available units past their expiry_date to 'expired'.
+
+Runs as `flask expire-units`, from POST /api/inventory/expiry-sweep, or as
+an in-process background thread when EXPIRY_SWEEP_INTERVAL is set. Each
+batch is one UPDATE ... WHERE id IN (SELECT ... LIMIT n [FOR UPDATE SKIP
+LOCKED]) RETURNING, committed on its own, so several workers can sweep at
+once without blocking each other or double-counting.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from cache import STATS_KEYS, invalidate_on_commit
+from inventory_summary import add_delta, new_deltas, record_deltas
+from models import db, BloodInventory
+
+DEFAULT_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+inventory_table = BloodInventory.__table__
+
+
+class SweepMetrics:
+    """Per-process counters describing past sweeps"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.units_expired = 0
+        self.failures = 0
+        self.last_run_at = None
+        self.last_expired = 0
+        self.last_duration_ms = 0.0
+
+    def record(self, expired, duration_ms, now):
+        with self._lock:
+            self.runs += 1
+            self.units_expired += expired
+            self.last_run_at = now
+            self.last_expired = expired
+            self.last_duration_ms = duration_ms
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'units_expired': self.units_expired,
+                'failures': self.failures,
+                'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+                'last_expired': self.last_expired,
+                'last_duration_ms': round(self.last_duration_ms, 2)
+            }
+
+
+metrics = SweepMetrics()
+
+
+def expire_batch(session, now, batch_size):
+    """Expire up to `batch_size` overdue units; returns how many changed"""
+    overdue = select(inventory_table.c.id).where(
+        inventory_table.c.status == 'available',
+        inventory_table.c.expiry_date < now
+    ).order_by(inventory_table.c.expiry_date).limit(batch_size).with_for_update(skip_locked=True)
+
+    changed = session.execute(
+        update(inventory_table)
+        .where(inventory_table.c.id.in_(overdue.scalar_subquery()))
+        .values(status='expired', updated_at=now)
+        .returning(inventory_table.c.blood_type, inventory_table.c.quantity_ml)
+    ).all()
+
+    if changed:
+        deltas = new_deltas()
+        for blood_type, quantity_ml in changed:
+            add_delta(deltas, blood_type, 'available', -1, quantity_ml)
+            add_delta(deltas, blood_type, 'expired', 1, quantity_ml)
+        record_deltas(session, deltas, now)
+        invalidate_on_commit(session, *STATS_KEYS)
+    return len(changed)
+
+
+def sweep_expired(session, batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """Expire every overdue unit in committed batches; returns the total"""
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+    total = 0
+    try:
+        while True:
+            expired = expire_batch(session, now, batch_size)
+            session.commit()
+            total += expired
+            if expired < batch_size:
+                break
+    except Exception:
+        session.rollback()
+        metrics.record_failure()
+        raise
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    metrics.record(total, duration_ms, now)
+    logger.info('Expiry sweep marked %d units expired in %.1f ms', total, duration_ms)
+    return total
+
+
+class ExpirySweeper(threading.Thread):
+    """Daemon thread that sweeps every `interval` seconds"""
+
+    def __init__(self, app, interval, batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(name='expiry-sweeper', daemon=True)
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    sweep_expired(db.session, self.batch_size)
+                except Exception:
+                    logger.exception('Expiry sweep failed')
+                finally:
+                    db.session.remove()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_expiry_sweeper(app):
+    """Start the background sweeper if EXPIRY_SWEEP_INTERVAL is positive"""
+    interval = app.config.get('EXPIRY_SWEEP_INTERVAL', 0)
+    if interval <= 0:
+        return None
+    sweeper = ExpirySweeper(app, interval, app.config['EXPIRY_SWEEP_BATCH_SIZE'])
+    sweeper.start()
+    app.extensions['expiry_sweeper'] = sweeper
+    return sweeper
@@ -0,0 +1,198 @@
+"""Per-type stock projection and shortage forecast behind GET /api/forecast.
+
+One UNION ALL query returns, per blood type and day, the units collected,
+used and expired over the last HISTORY_DAYS, the units in stock that reach
+their expiry date inside the horizon, and the current available stock.
+The rest is NumPy over (blood type x day) arrays:
+
+- daily inflow / usage / expiry curves, and their means and deviations;
+- expected stock: current + cumulative (inflow - usage) - wastage, where
+  wastage is the part of the scheduled expiries that FEFO allocation (oldest
+  units first) would not have used up by then;
+- a confidence band from the accumulated day-to-day variance of inflow and
+  usage (normal approximation, widening with the square root of the days).
+
+A type runs short on the first day its projection drops below
+LOW_STOCK_UNITS, the dashboard's "low" threshold.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, literal, null, select, union_all
+
+from aggregates import stock_status
+from models import db, BloodInventory, InventorySummary, BLOOD_TYPES
+
+HISTORY_DAYS = 90
+MAX_HORIZON_DAYS = 28
+LOW_STOCK_UNITS = 5
+CONFIDENCE = 0.95
+Z_SCORE = 1.96
+
+INFLOW, USAGE, EXPIRY, SCHEDULED, STOCK = 'inflow', 'usage', 'expiry', 'scheduled', 'stock'
+HISTORY_KINDS = (INFLOW, USAGE, EXPIRY)
+
+
+def _per_day(kind, column, *criteria):
+    day = func.date(column)
+    return select(
+        BloodInventory.blood_type,
+        day.label('day'),
+        literal(kind).label('kind'),
+        func.count().label('units')
+    ).where(*criteria).group_by(BloodInventory.blood_type, day)
+
+
+def history_query(today, horizon_days):
+    """The single columnar query: (blood_type, day, kind, units) rows"""
+    since = today - timedelta(days=HISTORY_DAYS)
+    until = today + timedelta(days=horizon_days + 1)
+    return union_all(
+        _per_day(INFLOW, BloodInventory.donation_date,
+                 BloodInventory.donation_date >= since, BloodInventory.donation_date < today),
+        _per_day(USAGE, BloodInventory.used_at, BloodInventory.status == 'used',
+                 BloodInventory.used_at >= since, BloodInventory.used_at < today),
+        _per_day(EXPIRY, BloodInventory.expiry_date, BloodInventory.status == 'expired',
+                 BloodInventory.expiry_date >= since, BloodInventory.expiry_date < today),
+        # Overdue units the sweep has not reached yet count as expiring today
+        _per_day(SCHEDULED, BloodInventory.expiry_date, BloodInventory.status == 'available',
+                 BloodInventory.expiry_date < until),
+        select(
+            InventorySummary.blood_type,
+            null().label('day'),
+            literal(STOCK).label('kind'),
+            InventorySummary.units
+        ).where(InventorySummary.status == 'available')
+    )
+
+
+def load_arrays(rows, today, horizon_days):
+    """Scatter query rows into per-kind (blood type x day) count arrays"""
+    types = len(BLOOD_TYPES)
+    arrays = {kind: np.zeros((types, HISTORY_DAYS)) for kind in HISTORY_KINDS}
+    arrays[SCHEDULED] = np.zeros((types, horizon_days + 1))
+    arrays[STOCK] = np.zeros(types)
+    if not rows:
+        return arrays
+
+    blood_types, days, kinds, units = zip(*rows)
+    index = {blood_type: i for i, blood_type in enumerate(BLOOD_TYPES)}
+    type_index = np.array([index.get(blood_type, -1) for blood_type in blood_types])
+    kinds = np.array(kinds)
+    units = np.array(units, dtype=float)
+    # PostgreSQL returns dates, SQLite 'YYYY-MM-DD' strings
+    days = np.array([str(day)[:10] if day is not None else 'NaT' for day in days], dtype='datetime64[D]')
+    today = np.datetime64(today.date(), 'D')
+    known = type_index >= 0
+
+    stock = known & (kinds == STOCK)
+    np.add.at(arrays[STOCK], type_index[stock], units[stock])
+
+    offsets = np.zeros(len(rows), dtype=int)
+    dated = ~np.isnat(days)
+    offsets[dated] = (days[dated] - today).astype(int)
+    for kind in HISTORY_KINDS:
+        mask = known & (kinds == kind)
+        np.add.at(arrays[kind], (type_index[mask], offsets[mask] + HISTORY_DAYS), units[mask])
+    mask = known & (kinds == SCHEDULED)
+    np.add.at(arrays[SCHEDULED], (type_index[mask], np.clip(offsets[mask], 0, horizon_days)), units[mask])
+    return arrays
+
+
+def project(arrays, horizon_days):
+    """Expected, lower and upper stock for days 1..horizon_days ahead"""
+    inflow, usage = arrays[INFLOW], arrays[USAGE]
+    days_ahead = np.arange(1, horizon_days + 1)
+
+    cumulative_usage = usage.mean(axis=1)[:, None] * days_ahead
+    cumulative_net = (inflow.mean(axis=1) - usage.mean(axis=1))[:, None] * days_ahead
+    # Units expiring by day t that usage (oldest first) has not consumed
+    scheduled = np.cumsum(arrays[SCHEDULED], axis=1)[:, 1:]
+    wastage = np.maximum.accumulate(np.maximum(scheduled - cumulative_usage, 0), axis=1)
+
+    expected = arrays[STOCK][:, None] + cumulative_net - wastage
+    spread = Z_SCORE * np.sqrt((inflow.var(axis=1) + usage.var(axis=1))[:, None] * days_ahead)
+    return np.maximum(expected, 0), np.maximum(expected - spread, 0), expected + spread
+
+
+def first_below(levels, current, today):
+    """Date of the first day `levels` drops below LOW_STOCK_UNITS, or None"""
+    if current < LOW_STOCK_UNITS:
+        return today.date().isoformat()
+    below = levels < LOW_STOCK_UNITS
+    if not below.any():
+        return None
+    return (today + timedelta(days=int(below.argmax()) + 1)).date().isoformat()
+
+
+def _rate(curve):
+    return {'mean': round(float(curve.mean()), 2), 'std': round(float(curve.std()), 2)}
+
+
+def compute_forecast(now=None, horizon_days=MAX_HORIZON_DAYS):
+    """Build the /api/forecast payload for the next `horizon_days` days"""
+    now = now or datetime.utcnow()
+    today = datetime.combine(now.date(), datetime.min.time())
+    rows = db.session.execute(history_query(today, horizon_days)).all()
+    arrays = load_arrays(rows, today, horizon_days)
+    expected, lower, upper = project(arrays, horizon_days)
+    dates = [(today + timedelta(days=day)).date().isoformat() for day in range(1, horizon_days + 1)]
+
+    blood_types = []
+    for i, blood_type in enumerate(BLOOD_TYPES):
+        current = int(arrays[STOCK][i])
+        blood_types.append({
+            'blood_type': blood_type,
+            'current_units': current,
+            'daily_inflow': _rate(arrays[INFLOW][i]),
+            'daily_usage': _rate(arrays[USAGE][i]),
+            'daily_expiry': _rate(arrays[EXPIRY][i]),
+            'scheduled_expiries': int(arrays[SCHEDULED][i].sum()),
+            'projection': [
+                {'date': date, 'units': round(float(e), 1), 'lower': round(float(lo), 1),
+                 'upper': round(float(hi), 1)}
+                for date, e, lo, hi in zip(dates, expected[i], lower[i], upper[i])
+            ],
+            'shortage_date': first_below(expected[i], current, today),
+            'earliest_shortage_date': first_below(lower[i], current, today),
+            'status': stock_status(int(round(float(expected[i][-1])))),
+        })
+
+    return {
+        'generated_at': now.isoformat(),
+        'history_days': HISTORY_DAYS,
+        'horizon_days': horizon_days,
+        'confidence': CONFIDENCE,
+        'low_stock_units': LOW_STOCK_UNITS,
+        'blood_types': blood_types,
+    }
+
+
+def _until(date, end):
+    return date if date and date <= end else None
+
+
+def trim_forecast(forecast, horizon_days, blood_types=None):
+    """Cut a cached full-horizon forecast down to `horizon_days` and `blood_types`"""
+    entries = []
+    for entry in forecast['blood_types']:
+        if blood_types and entry['blood_type'] not in blood_types:
+            continue
+        projection = entry['projection'][:horizon_days]
+        end = projection[-1]['date']
+        entries.append(dict(
+            entry,
+            projection=projection,
+            shortage_date=_until(entry['shortage_date'], end),
+            earliest_shortage_date=_until(entry['earliest_shortage_date'], end),
+            status=stock_status(int(round(projection[-1]['units'])))
+        ))
+    shortages = sorted(
+        (entry['shortage_date'], entry['blood_type']) for entry in entries if entry['shortage_date']
+    )
+    return dict(
+        forecast,
+        horizon_days=horizon_days,
+        blood_types=entries,
+        shortages=[blood_type for _, blood_type in shortages]
+    )
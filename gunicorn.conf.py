@@ -0,0 +1,28 @@
+"""Gunicorn settings: worker count from the environment, multi-process metrics.
+
+PROMETHEUS_MULTIPROC_DIR must be set before workers import prometheus_client,
+so it is defaulted here (the master reads this file first) and wiped on
+start; child_exit drops a dead worker's live gauges.
+"""
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'hemobank-metrics')
+)
+
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,40 @@
+"""Access control for the operational endpoints (/internal/*, /metrics).
+
+They expose pool sizes, endpoint names and traffic, so they are not public:
+with INTERNAL_TOKEN set, a request must send `Authorization: Bearer <token>`;
+without it, only clients on a loopback address (a scraper or curl on the
+same host) are answered. Everyone else gets a 403.
+"""
+import hmac
+import ipaddress
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+
+def _is_loopback(address):
+    try:
+        return ipaddress.ip_address(address or '').is_loopback
+    except ValueError:
+        return False
+
+
+def internal_access_denied():
+    """None if this request may read internal endpoints, else a 403 response"""
+    token = current_app.config['INTERNAL_TOKEN']
+    if token:
+        sent = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        allowed = hmac.compare_digest(sent.encode(), token.encode())
+    else:
+        allowed = _is_loopback(request.remote_addr)
+    if allowed:
+        return None
+    return jsonify({'error': 'Forbidden'}), 403
+
+
+def internal_only(view):
+    """Guard `view` with internal_access_denied()"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return internal_access_denied() or view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,190 @@
+"""Live inventory change feed behind /api/inventory/stream.
+
+Every inventory_summary delta is also published as an event once its
+transaction commits. On PostgreSQL the event is sent with pg_notify inside
+the writing transaction, and each worker runs one LISTEN connection that
+fans notifications out to its local subscribers, so a change made in any
+worker reaches every open stream. Other databases publish in-process after
+commit. Either way, N open dashboards share one feed instead of N polling
+loops.
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, func
+from sqlalchemy import select as sql_select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+CHANNEL = 'inventory_changes'
+HEARTBEAT_SECONDS = 15
+# Full snapshots also refresh the time-based "expiring soon" counts
+SNAPSHOT_SECONDS = 300
+# Subscribers that fall this far behind get a fresh snapshot instead
+STREAM_QUEUE_SIZE = 256
+LISTEN_RETRY_SECONDS = 5
+
+_PENDING_KEY = 'inventory_events'
+
+logger = logging.getLogger(__name__)
+
+
+class Broker:
+    """In-process fan-out of events to subscriber callbacks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.add(callback)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers.discard(callback)
+
+    def publish(self, payload):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception('Inventory event subscriber failed')
+
+    def __len__(self):
+        return len(self._subscribers)
+
+
+broker = Broker()
+
+
+def delta_event(deltas, now=None):
+    """JSON-ready event for a {(blood_type, status): [units, total_ml]} delta"""
+    return {
+        'at': (now or datetime.utcnow()).isoformat(),
+        'deltas': [
+            {'blood_type': blood_type, 'status': status, 'units': units, 'total_ml': total_ml}
+            for (blood_type, status), (units, total_ml) in sorted(deltas.items())
+            if units or total_ml
+        ],
+    }
+
+
+def publish_deltas(session, deltas, now=None):
+    """Publish `deltas` to stream subscribers once `session` commits"""
+    payload = delta_event(deltas, now)
+    if not payload['deltas']:
+        return
+    connection = session.connection()
+    if connection.dialect.name == 'postgresql':
+        # Delivered by Postgres on commit, dropped on rollback
+        connection.execute(sql_select(func.pg_notify(CHANNEL, json.dumps(payload))))
+    else:
+        session.info.setdefault(_PENDING_KEY, []).append(payload)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_committed(session):
+    for payload in session.info.pop(_PENDING_KEY, ()):
+        broker.publish(payload)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+class NotifyListener(threading.Thread):
+    """LISTENs on CHANNEL with a dedicated connection and feeds the broker"""
+
+    def __init__(self, url):
+        super().__init__(name='inventory-notify-listener', daemon=True)
+        # Outside the app's pool so the listener never takes a request's slot
+        self.engine = create_engine(url, poolclass=NullPool)
+
+    def run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Inventory LISTEN connection failed; retrying')
+                time.sleep(LISTEN_RETRY_SECONDS)
+
+    def _listen(self):
+        connection = self.engine.raw_connection()
+        try:
+            dbapi_connection = connection.driver_connection
+            dbapi_connection.autocommit = True
+            dbapi_connection.cursor().execute(f'LISTEN {CHANNEL}')
+            while True:
+                if not select.select([dbapi_connection], [], [], HEARTBEAT_SECONDS)[0]:
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notify = dbapi_connection.notifies.pop(0)
+                    broker.publish(json.loads(notify.payload))
+        finally:
+            connection.close()
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener(engine):
+    """Start this worker's LISTEN thread on first use (PostgreSQL only)"""
+    global _listener
+    if engine.dialect.name != 'postgresql' or _listener is not None:
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = NotifyListener(engine.url)
+            _listener.start()
+
+
+def format_event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+def event_stream(snapshot):
+    """SSE generator for one client: a snapshot, then deltas as they commit.
+
+    `snapshot()` returns the dashboard payload; it is sent first, every
+    SNAPSHOT_SECONDS, and whenever the client's queue overflowed. The
+    subscription is taken before the first snapshot, so a change racing it
+    may be counted twice rather than missed; the next snapshot settles it.
+    """
+    events = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    overflowed = threading.Event()
+
+    def deliver(payload):
+        try:
+            events.put_nowait(payload)
+        except queue.Full:
+            overflowed.set()
+
+    unsubscribe = broker.subscribe(deliver)
+    try:
+        yield format_event('snapshot', snapshot())
+        snapshot_at = time.monotonic()
+        while True:
+            if overflowed.is_set() or time.monotonic() - snapshot_at >= SNAPSHOT_SECONDS:
+                overflowed.clear()
+                while not events.empty():
+                    events.get_nowait()
+                yield format_event('snapshot', snapshot())
+                snapshot_at = time.monotonic()
+            try:
+                yield format_event('delta', events.get(timeout=HEARTBEAT_SECONDS))
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+    finally:
+        unsubscribe()
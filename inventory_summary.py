@@ -0,0 +1,160 @@
+"""Incremental maintenance of the inventory_summary counters table.
+
+ORM changes to BloodInventory rows (record, use, delete, cascades) are
+picked up by a before_flush hook and applied as upserts in the same
+transaction. Set-based writes that bypass the unit of work (bulk inserts,
+the expiry sweep) must call `record_deltas` themselves. Either way the
+deltas are also published to the live stream (inventory_events.py) and
+the cached forecast is dropped on commit. `rebuild_summary`
+recomputes everything from blood_inventory.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import DateTime, delete, event, func, inspect, insert, literal, select, text, update
+from sqlalchemy.orm import Session
+
+from cache import FORECAST, invalidate_on_commit
+from inventory_events import publish_deltas
+from models import BloodInventory, InventorySummary
+
+DEFAULT_STATUS = 'available'
+DEFAULT_QUANTITY_ML = 450
+
+summary_table = InventorySummary.__table__
+
+
+def new_deltas():
+    """{(blood_type, status): [units, total_ml]} accumulator"""
+    return defaultdict(lambda: [0, 0])
+
+
+def add_delta(deltas, blood_type, status, units, quantity_ml):
+    entry = deltas[(blood_type, status or DEFAULT_STATUS)]
+    entry[0] += units
+    entry[1] += units * (quantity_ml if quantity_ml is not None else DEFAULT_QUANTITY_ML)
+
+
+def _upsert_statement(dialect_name):
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    stmt = dialect_insert(summary_table)
+    return stmt.on_conflict_do_update(
+        index_elements=[summary_table.c.blood_type, summary_table.c.status],
+        set_={
+            'units': summary_table.c.units + stmt.excluded.units,
+            'total_ml': summary_table.c.total_ml + stmt.excluded.total_ml,
+            'updated_at': stmt.excluded.updated_at,
+        }
+    )
+
+
+def apply_deltas(connection, deltas, now=None):
+    """Add `deltas` to the counters on `connection` (inside its transaction)"""
+    now = now or datetime.utcnow()
+    rows = [
+        {'blood_type': blood_type, 'status': status, 'units': units, 'total_ml': total_ml, 'updated_at': now}
+        for (blood_type, status), (units, total_ml) in deltas.items()
+        if units or total_ml
+    ]
+    if not rows:
+        return
+
+    upsert = _upsert_statement(connection.dialect.name)
+    if upsert is not None:
+        connection.execute(upsert, rows)
+        return
+
+    for row in rows:
+        result = connection.execute(
+            update(summary_table)
+            .where(summary_table.c.blood_type == row['blood_type'], summary_table.c.status == row['status'])
+            .values(
+                units=summary_table.c.units + row['units'],
+                total_ml=summary_table.c.total_ml + row['total_ml'],
+                updated_at=now
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(summary_table), [row])
+
+
+def record_deltas(session, deltas, now=None):
+    """Apply `deltas` in `session`'s transaction and publish them on commit"""
+    apply_deltas(session.connection(), deltas, now)
+    publish_deltas(session, deltas, now)
+    invalidate_on_commit(session, FORECAST)
+
+
+def _state(unit, history_of=None):
+    values = []
+    for key in ('blood_type', 'status', 'quantity_ml'):
+        if history_of is not None:
+            history = history_of.attrs[key].history
+            if history.deleted:
+                values.append(history.deleted[0])
+                continue
+        values.append(getattr(unit, key))
+    return values
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_inventory_changes(session, flush_context, instances):
+    deltas = new_deltas()
+
+    for obj in session.new:
+        if isinstance(obj, BloodInventory):
+            add_delta(deltas, obj.blood_type, obj.status, 1, obj.quantity_ml)
+
+    for obj in session.deleted:
+        if isinstance(obj, BloodInventory):
+            blood_type, status, quantity_ml = _state(obj, inspect(obj))
+            add_delta(deltas, blood_type, status, -1, quantity_ml)
+
+    for obj in session.dirty:
+        if not isinstance(obj, BloodInventory):
+            continue
+        old = _state(obj, inspect(obj))
+        new = _state(obj)
+        if old != new:
+            add_delta(deltas, old[0], old[1], -1, old[2])
+            add_delta(deltas, new[0], new[1], 1, new[2])
+
+    if deltas:
+        record_deltas(session, deltas)
+
+
+def rebuild_summary(session):
+    """Recompute every counter from blood_inventory; returns the row count"""
+    connection = session.connection()
+    if connection.dialect.name == 'postgresql':
+        # Block inventory writers until the rebuilt counters are committed
+        connection.execute(text('LOCK TABLE blood_inventory IN SHARE MODE'))
+
+    connection.execute(delete(summary_table))
+    status = func.coalesce(BloodInventory.status, DEFAULT_STATUS)
+    result = connection.execute(
+        insert(summary_table).from_select(
+            ['blood_type', 'status', 'units', 'total_ml', 'updated_at'],
+            select(
+                BloodInventory.blood_type,
+                status,
+                func.count(BloodInventory.id),
+                func.coalesce(func.sum(BloodInventory.quantity_ml), 0),
+                literal(datetime.utcnow(), DateTime),
+            ).group_by(BloodInventory.blood_type, status)
+        )
+    )
+    return result.rowcount
+
+
+def summary_needs_rebuild(session):
+    """True when the counters are empty but the inventory is not"""
+    has_summary = session.execute(select(summary_table.c.blood_type).limit(1)).first()
+    if has_summary:
+        return False
+    return session.execute(select(BloodInventory.id).limit(1)).first() is not None
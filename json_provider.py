@@ -0,0 +1,64 @@
+"""Flask JSON provider: orjson when installed, the stdlib otherwise.
+
+Both backends write dates and datetimes as ISO 8601 (what every to_dict()
+does by hand), so serializers can hand over datetime objects and leave the
+formatting to orjson's C encoder. Key order, indentation in debug and the
+trailing newline match Flask's default provider; orjson emits non-ASCII
+characters as UTF-8 rather than \\u escapes.
+"""
+import dataclasses
+import decimal
+import uuid
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def _options(self, kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _encode(self, obj, kwargs):
+        return orjson.dumps(obj, default=_default, option=self._options(kwargs))
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or 'cls' in kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj, kwargs).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._encode(obj, {'indent': indent}) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,103 @@
+"""Prometheus metrics: per-endpoint latency, status codes and DB usage.
+
+Request metrics are labelled by Flask endpoint (e.g. donors.get_all_donors)
+and read the per-request query count and DB time that query_log keeps in
+flask.g. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py
+does) so every worker writes to shared mmap files and /metrics aggregates
+them; without it the metrics are per process. Available units per blood
+type are read from inventory_summary at scrape time. Scrapers off the host
+authenticate with INTERNAL_TOKEN (internal_access.py).
+"""
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from internal_access import internal_only
+from models import InventorySummary, BLOOD_TYPES
+
+UNMATCHED = 'unmatched'
+
+REQUEST_LATENCY = Histogram(
+    'hemobank_request_duration_seconds', 'Request latency by endpoint',
+    ['endpoint', 'method'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+REQUESTS = Counter(
+    'hemobank_requests_total', 'Requests by endpoint and status code',
+    ['endpoint', 'method', 'status']
+)
+DB_QUERIES = Histogram(
+    'hemobank_request_db_queries', 'SQL statements executed per request',
+    ['endpoint'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+DB_TIME = Histogram(
+    'hemobank_request_db_seconds', 'Time spent in SQL per request',
+    ['endpoint'],
+    buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+)
+
+
+class InventoryCollector:
+    """Available units and volume per blood type, from the summary counters"""
+
+    def collect(self):
+        units = GaugeMetricFamily(
+            'hemobank_available_units', 'Available blood units', labels=['blood_type']
+        )
+        volume = GaugeMetricFamily(
+            'hemobank_available_ml', 'Available blood volume in ml', labels=['blood_type']
+        )
+        rows = {
+            row.blood_type: row for row in
+            InventorySummary.query.filter_by(status='available').all()
+        }
+        for blood_type in BLOOD_TYPES:
+            row = rows.get(blood_type)
+            units.add_metric([blood_type], row.units if row else 0)
+            volume.add_metric([blood_type], row.total_ml if row else 0)
+        yield units
+        yield volume
+
+
+def render_metrics():
+    """Prometheus text exposition for this process (or all workers)"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    inventory = CollectorRegistry()
+    inventory.register(InventoryCollector())
+    return generate_latest(registry) + generate_latest(inventory)
+
+
+def init_metrics(app):
+    """Record request metrics and serve them at /metrics"""
+
+    @app.before_request
+    def start_metrics_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        endpoint = request.endpoint or UNMATCHED
+        REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+        DB_QUERIES.labels(endpoint).observe(g.get('db_queries', 0))
+        DB_TIME.labels(endpoint).observe(g.get('db_time', 0.0))
+        return response
+
+    @app.route('/metrics')
+    @internal_only
+    def metrics():
+        return Response(render_metrics(), content_type=CONTENT_TYPE_LATEST)
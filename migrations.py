@@ -0,0 +1,127 @@
+"""Ordered schema migrations for databases created before a model change.
+
+`db.create_all()` only creates missing tables, so indexes added to existing
+tables ship here. Applied versions are recorded in schema_migrations; run
+pending ones with `flask db-upgrade`. On PostgreSQL, indexes are built
+CONCURRENTLY (outside a transaction) so production tables stay writable.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', metadata,
+    Column('version', String(64), primary_key=True),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def _create_index(connection, name, table, columns, where=None, using=None):
+    concurrently = ' CONCURRENTLY' if connection.dialect.name == 'postgresql' else ''
+    method = f' USING {using}' if using else ''
+    sql = f'CREATE INDEX{concurrently} IF NOT EXISTS {name} ON {table}{method} ({columns})'
+    if where:
+        sql += f' WHERE {where}'
+    connection.exec_driver_sql(sql)
+
+
+def _drop_index(connection, name):
+    concurrently = ' CONCURRENTLY' if connection.dialect.name == 'postgresql' else ''
+    connection.exec_driver_sql(f'DROP INDEX{concurrently} IF EXISTS {name}')
+
+
+def query_pattern_indexes(connection):
+    """Composite/partial indexes for the hot inventory, donor and donation reads"""
+    _create_index(connection, 'ix_blood_inventory_available_type_expiry',
+                  'blood_inventory', 'blood_type, expiry_date', "status = 'available'")
+    _create_index(connection, 'ix_blood_inventory_available_expiry_id',
+                  'blood_inventory', 'expiry_date, id', "status = 'available'")
+    _create_index(connection, 'ix_donations_donor_id_donation_date',
+                  'donations', 'donor_id, donation_date')
+    _create_index(connection, 'ix_donors_registered_on_id',
+                  'donors', 'registered_on, id')
+    # Superseded by the indexes above
+    _drop_index(connection, 'ix_blood_inventory_type_status_expiry')
+    _drop_index(connection, 'ix_donations_donor_id')
+
+
+def updated_at_indexes(connection):
+    """MAX(updated_at) lookups behind the list endpoints' ETags (conditional.py)"""
+    for table in ('donors', 'donations', 'blood_inventory'):
+        _create_index(connection, f'ix_{table}_updated_at', table, 'updated_at')
+
+
+def donor_search_indexes(connection):
+    """Trigram indexes behind /api/donors/search (search.py)"""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        connection.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in ('name', 'email', 'phone'):
+            _create_index(connection, f'ix_donors_{column}_trgm', 'donors',
+                          f'{column} gin_trgm_ops', using='gin')
+    elif dialect == 'sqlite':
+        # External-content FTS5 table over donors, kept in step by triggers
+        connection.exec_driver_sql(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS donors_search USING fts5("
+            "name, email, phone, content='donors', content_rowid='id', tokenize='trigram')"
+        )
+        connection.exec_driver_sql(
+            "CREATE TRIGGER IF NOT EXISTS donors_search_insert AFTER INSERT ON donors BEGIN "
+            "INSERT INTO donors_search (rowid, name, email, phone) "
+            "VALUES (new.id, new.name, new.email, new.phone); END"
+        )
+        connection.exec_driver_sql(
+            "CREATE TRIGGER IF NOT EXISTS donors_search_delete AFTER DELETE ON donors BEGIN "
+            "INSERT INTO donors_search (donors_search, rowid, name, email, phone) "
+            "VALUES ('delete', old.id, old.name, old.email, old.phone); END"
+        )
+        connection.exec_driver_sql(
+            "CREATE TRIGGER IF NOT EXISTS donors_search_update AFTER UPDATE OF name, email, phone "
+            "ON donors BEGIN "
+            "INSERT INTO donors_search (donors_search, rowid, name, email, phone) "
+            "VALUES ('delete', old.id, old.name, old.email, old.phone); "
+            "INSERT INTO donors_search (rowid, name, email, phone) "
+            "VALUES (new.id, new.name, new.email, new.phone); END"
+        )
+        connection.exec_driver_sql("INSERT INTO donors_search (donors_search) VALUES ('rebuild')")
+
+
+def donor_eligibility_index(connection):
+    """(blood_type, last_donation) for set-based eligibility (eligibility.py)"""
+    _create_index(connection, 'ix_donors_blood_type_last_donation',
+                  'donors', 'blood_type, last_donation')
+    # Superseded by the index above
+    _drop_index(connection, 'ix_donors_blood_type')
+
+
+MIGRATIONS = [
+    ('0001_query_pattern_indexes', query_pattern_indexes),
+    ('0002_updated_at_indexes', updated_at_indexes),
+    ('0003_donor_search_indexes', donor_search_indexes),
+    ('0004_donor_eligibility_index', donor_eligibility_index),
+]
+
+
+def applied_versions(engine):
+    with engine.begin() as connection:
+        metadata.create_all(connection)
+        return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def upgrade(engine):
+    """Apply pending migrations in order; returns the versions applied"""
+    done = applied_versions(engine)
+    applied = []
+    for version, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.connect() as connection:
+            connection = connection.execution_options(isolation_level='AUTOCOMMIT')
+            migrate(connection)
+            connection.execute(
+                schema_migrations.insert().values(version=version, applied_at=datetime.utcnow())
+            )
+        applied.append(version)
+    return applied
@@ -2,24 +2,51 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timedelta
 import uuid
 
-db = SQLAlchemy()
+from routing import RoutingSession
+from serializers import RowShape
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+BLOOD_TYPES = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+DONATION_INTERVAL_DAYS = 90
+SHELF_LIFE_DAYS = 35
+
+# Partial-index predicate for the hot "available stock" queries
+AVAILABLE_ONLY = db.text("status = 'available'")
+
+
+def oversized_fields(model, row):
+    """Keys of `row` whose string values exceed their String(n) column on `model`"""
+    columns = model.__table__.columns
+    return [
+        key for key, value in row.items()
+        if isinstance(value, str) and key in columns
+        and getattr(columns[key].type, 'length', None) and len(value) > columns[key].type.length
+    ]
+
 
 class Donor(db.Model):
     """Blood Donor Model"""
     __tablename__ = 'donors'
+    __table_args__ = (
+        # Keyset pagination of GET /api/donors
+        db.Index('ix_donors_registered_on_id', 'registered_on', 'id'),
+        # Per-type eligibility (90-day rule) scans; see eligibility.py
+        db.Index('ix_donors_blood_type_last_donation', 'blood_type', 'last_donation'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False, index=True)
     age = db.Column(db.Integer, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     phone = db.Column(db.String(15), unique=True, nullable=False, index=True)
-    blood_type = db.Column(db.String(3), nullable=False, index=True)
+    blood_type = db.Column(db.String(3), nullable=False)
     address = db.Column(db.Text)
     emergency_contact = db.Column(db.String(15))
     registered_on = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     last_donation = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     donations = db.relationship('Donation', backref='donor', lazy=True, cascade='all, delete-orphan')
     
@@ -38,7 +65,7 @@ class Donor(db.Model):
             'emergency_contact': self.emergency_contact,
             'registered_on': self.registered_on.isoformat(),
             'last_donation': self.last_donation.isoformat() if self.last_donation else None,
-            'total_donations': len(self.donations),
+            'total_donations': self.donation_count,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
@@ -48,15 +75,27 @@ class Donor(db.Model):
         if not self.last_donation:
             return True
         days_since = (datetime.utcnow() - self.last_donation).days
-        return days_since >= 90
+        return days_since >= DONATION_INTERVAL_DAYS
+    
+    @classmethod
+    def eligible_clause(cls, now):
+        """SQL counterpart of can_donate() at `now`"""
+        return db.or_(
+            cls.last_donation.is_(None),
+            cls.last_donation <= now - timedelta(days=DONATION_INTERVAL_DAYS)
+        )
 
 
 class Donation(db.Model):
     """Blood Donation Record"""
     __tablename__ = 'donations'
+    __table_args__ = (
+        # A donor's history and the per-donor count (also serves donor_id lookups)
+        db.Index('ix_donations_donor_id_donation_date', 'donor_id', 'donation_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    donor_id = db.Column(db.Integer, db.ForeignKey('donors.id'), nullable=False, index=True)
+    donor_id = db.Column(db.Integer, db.ForeignKey('donors.id'), nullable=False)
     donation_date = db.Column(db.DateTime, nullable=False, index=True)
     quantity_ml = db.Column(db.Integer, default=450, nullable=False)
     hemoglobin = db.Column(db.Float, nullable=False)
@@ -64,7 +103,7 @@ class Donation(db.Model):
     notes = db.Column(db.Text)
     recorded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     blood_inventory = db.relationship('BloodInventory', backref='donation_source', lazy=True, cascade='all, delete-orphan')
     
@@ -88,9 +127,33 @@ class Donation(db.Model):
         }
 
 
+# Deferred so single-row reads don't pay for it; list endpoints undefer it to
+# get every donor's count from one correlated subquery instead of lazy-loading
+# each donor's donations.
+Donor.donation_count = db.column_property(
+    db.select(db.func.count(Donation.id))
+    .where(Donation.donor_id == Donor.id)
+    .correlate_except(Donation)
+    .scalar_subquery(),
+    deferred=True
+)
+
+
 class BloodInventory(db.Model):
     """Blood Stock/Inventory"""
     __tablename__ = 'blood_inventory'
+    __table_args__ = (
+        # Per-type stock and FEFO allocation
+        db.Index(
+            'ix_blood_inventory_available_type_expiry', 'blood_type', 'expiry_date',
+            postgresql_where=AVAILABLE_ONLY, sqlite_where=AVAILABLE_ONLY
+        ),
+        # Inventory list pages, expiring-soon counts and the expiry sweep
+        db.Index(
+            'ix_blood_inventory_available_expiry_id', 'expiry_date', 'id',
+            postgresql_where=AVAILABLE_ONLY, sqlite_where=AVAILABLE_ONLY
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     blood_type = db.Column(db.String(3), nullable=False, index=True)
@@ -102,12 +165,12 @@ class BloodInventory(db.Model):
     added_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     used_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if self.donation_date and not self.expiry_date:
-            self.expiry_date = self.donation_date + timedelta(days=35)
+            self.expiry_date = self.donation_date + timedelta(days=SHELF_LIFE_DAYS)
     
     def __repr__(self):
         return f'<BloodInventory {self.blood_type} - {self.quantity_ml}ml>'
@@ -137,4 +200,73 @@ class BloodInventory(db.Model):
             'used_at': self.used_at.isoformat() if self.used_at else None,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+
+def _inventory_expiry(item, now):
+    """BloodInventory.is_expired() / days_until_expiry() for a row dict"""
+    expired = now > item['expiry_date']
+    item['is_expired'] = expired
+    item['days_until_expiry'] = 0 if expired else (item['expiry_date'] - now).days
+
+
+# Column-tuple equivalents of the to_dict() methods above, for list endpoints;
+# keep the two in step.
+DONOR_ROWS = RowShape(Donor, [
+    Donor.id, Donor.name, Donor.age, Donor.email, Donor.phone, Donor.blood_type,
+    Donor.address, Donor.emergency_contact, Donor.registered_on, Donor.last_donation,
+    Donor.donation_count.label('total_donations'), Donor.created_at, Donor.updated_at
+])
+
+DONATION_ROWS = RowShape(Donation, [
+    Donation.id, Donation.donor_id, Donor.name.label('donor_name'),
+    Donor.blood_type.label('blood_type'), Donation.donation_date, Donation.quantity_ml,
+    Donation.hemoglobin, Donation.blood_pressure, Donation.notes, Donation.recorded_at,
+    Donation.created_at, Donation.updated_at
+], joins=[(Donor, Donation.donor_id == Donor.id)])
+
+INVENTORY_ROWS = RowShape(BloodInventory, [
+    BloodInventory.id, BloodInventory.blood_type, BloodInventory.quantity_ml,
+    BloodInventory.donation_id, BloodInventory.donation_date, BloodInventory.expiry_date,
+    BloodInventory.status, BloodInventory.added_at, BloodInventory.used_at,
+    BloodInventory.created_at, BloodInventory.updated_at
+], derived=_inventory_expiry)
+
+
+class InventorySummary(db.Model):
+    """Running unit/volume totals per blood type and status.
+
+    Kept in step with blood_inventory by inventory_summary.py so stock reads
+    touch a handful of rows instead of aggregating the whole inventory.
+    """
+    __tablename__ = 'inventory_summary'
+    
+    blood_type = db.Column(db.String(3), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    total_ml = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<InventorySummary {self.blood_type} {self.status}: {self.units}>'
+    
+    def to_dict(self):
+        return {
+            'blood_type': self.blood_type,
+            'status': self.status,
+            'units': self.units,
+            'total_ml': self.total_ml,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class CacheSnapshot(db.Model):
+    """Last result of a cached aggregate, shared between workers (singleflight.py)"""
+    __tablename__ = 'cache_snapshots'
+    
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Text, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<CacheSnapshot {self.key} at {self.computed_at}>'
@@ -0,0 +1,149 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.types import DateTime
+
+from serializers import row_to_dict, serialize_value
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+PAGINATION_ARGS = ('limit', 'cursor', 'fields')
+
+
+class PaginationError(ValueError):
+    """Raised for a malformed limit, cursor or fields argument"""
+
+
+def wants_pagination(args):
+    """List endpoints keep returning a plain array unless a page is asked for"""
+    return any(key in args for key in PAGINATION_ARGS)
+
+
+def parse_limit(value):
+    if value is None:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be at least 1')
+    return min(limit, MAX_LIMIT)
+
+
+def parse_fields(model, value):
+    """Resolve `fields=a,b,c` to column names of `model` (None means all)"""
+    if not value:
+        return None
+    columns = model.__table__.columns.keys()
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in columns]
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def encode_cursor(values):
+    payload = json.dumps([serialize_value(value) for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _cursor_values(cursor, count):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    if not isinstance(values, list) or len(values) != count:
+        raise ValueError('cursor does not match sort key')
+    return values
+
+
+def decode_cursor(cursor, columns):
+    try:
+        values = _cursor_values(cursor, len(columns))
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+
+
+def decode_offset_cursor(cursor):
+    """Offset from an encode_cursor([offset]) cursor, for rank-ordered results"""
+    try:
+        [offset] = _cursor_values(cursor, 1)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+    if not isinstance(offset, int) or offset < 0:
+        raise PaginationError('Invalid cursor')
+    return offset
+
+
+def keyset_after(columns, values):
+    """WHERE clause selecting rows strictly after `values` in (columns) order"""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal_prefix, column > values[i]))
+    return or_(*clauses)
+
+
+def page_statement(statement, model, sort_columns, args, options=(), tuples=False):
+    """Turn a select() of `model` into one keyset page; returns (statement, page).
+
+    `sort_columns` must end in a unique column (the primary key) so the
+    cursor is unambiguous. With `fields=` only those columns (plus the sort
+    key) are selected and ORM instances are never built; otherwise the
+    loader `options` are applied. Pass `tuples=True` when `statement`
+    already selects columns (a RowShape) rather than `model` entities.
+    `page` is what page_envelope needs.
+    """
+    limit = parse_limit(args.get('limit'))
+    fields = parse_fields(model, args.get('fields'))
+    sort_keys = [column.key for column in sort_columns]
+
+    cursor = args.get('cursor')
+    if cursor:
+        statement = statement.where(keyset_after(sort_columns, decode_cursor(cursor, sort_columns)))
+    statement = statement.order_by(*sort_columns)
+
+    if fields:
+        selected = fields + [key for key in sort_keys if key not in fields]
+        statement = statement.with_only_columns(*[getattr(model, key) for key in selected])
+    elif options:
+        statement = statement.options(*options)
+
+    page = {'limit': limit, 'fields': fields, 'sort_keys': sort_keys, 'tuples': tuples or bool(fields)}
+    return statement.limit(limit + 1), page
+
+
+def page_envelope(result, page, serialize):
+    """Build the response envelope from the executed page_statement result"""
+    limit = page['limit']
+    fields = page['fields']
+    rows = result.all() if page['tuples'] else result.scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if fields:
+        items = [row_to_dict(fields, row) for row in rows]
+    else:
+        items = [serialize(row) for row in rows]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, key) for key in page['sort_keys']])
+
+    return {
+        'items': items,
+        'next_cursor': next_cursor,
+        'limit': limit
+    }
+
+
+def paginate(session, statement, shape, sort_columns, args, now=None):
+    """Run one keyset page of a RowShape `statement` and build the response envelope"""
+    statement, page = page_statement(statement, shape.model, sort_columns, args, tuples=True)
+    return page_envelope(session.execute(statement), page, shape.serializer(now))
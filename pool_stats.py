@@ -0,0 +1,106 @@
+"""Connection pool instrumentation.
+
+InstrumentedQueuePool times every checkout, including the wait for a free
+connection when the pool is exhausted, so /internal/pool can report how
+close each worker is to its pool limit.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class PoolWaitStats:
+    """Checkout count, wait time and timeouts for one pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if timed_out:
+                self.timeouts += 1
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'total_wait_ms': round(self.total_wait * 1000, 3),
+                'avg_wait_ms': round(self.total_wait * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3)
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+
+def _instrumented(url, options):
+    if str(url).startswith('sqlite'):
+        return options
+    return {'poolclass': InstrumentedQueuePool, **options}
+
+
+def init_pool_stats(app):
+    """Use the instrumented pool for server databases, replica bind included (SQLite keeps its own)"""
+    config = app.config
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = _instrumented(
+        config['SQLALCHEMY_DATABASE_URI'], config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    )
+    binds = {}
+    for key, bind in config.get('SQLALCHEMY_BINDS', {}).items():
+        options = bind if isinstance(bind, dict) else {'url': bind}
+        binds[key] = _instrumented(options['url'], options)
+    config['SQLALCHEMY_BINDS'] = binds
+
+
+def pool_status(engine):
+    """Live statistics for `engine`'s pool in this worker process"""
+    pool = engine.pool
+    status = {'pool_class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    status['max_overflow'] = getattr(pool, '_max_overflow', None)
+    status['timeout'] = pool.timeout() if callable(getattr(pool, 'timeout', None)) else None
+    wait_stats = getattr(pool, 'wait_stats', None)
+    if wait_stats is not None:
+        status['wait'] = wait_stats.to_dict()
+    return status
+
+
+def all_pool_status(engines):
+    return {
+        'pid': os.getpid(),
+        'pools': {key or 'default': pool_status(engine) for key, engine in engines.items()}
+    }
@@ -0,0 +1,151 @@
+"""Structured, sampled SQL logging and per-request database timing.
+
+Every statement is timed with before/after_cursor_execute. Statements
+slower than SLOW_QUERY_MS are always logged at WARNING; the rest are logged
+at INFO for a QUERY_LOG_SAMPLE_RATE fraction. Each request counts its
+statements and database time in flask.g (db_queries, db_time), which the
+query lines and the request summary line carry along.
+
+Records are emitted as JSON lines through a QueueHandler; a QueueListener
+thread does the formatting and stream writes, so request threads never
+block on stdout.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+MAX_STATEMENT_CHARS = 1000
+
+sql_logger = logging.getLogger('hemobank.sql')
+request_logger = logging.getLogger('hemobank.request')
+
+_listener = None
+
+# [statements, seconds] for requests served outside Flask (the ASGI routes)
+request_usage = contextvars.ContextVar('request_usage', default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, merged with the record's `fields` extra"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def init_log_queue(level='INFO'):
+    """Route the root logger through a queue drained by a background thread"""
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return _listener
+
+    handlers = root.handlers[:] or [logging.StreamHandler(sys.stderr)]
+    for handler in handlers:
+        handler.setFormatter(JsonFormatter())
+        root.removeHandler(handler)
+    log_queue = queue.SimpleQueue()
+    root.addHandler(QueueHandler(log_queue))
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def request_fields():
+    """Per-request context attached to query and request log lines"""
+    if not has_request_context():
+        return {}
+    return {
+        'method': request.method,
+        'path': request.path,
+        'db_queries': g.get('db_queries', 0),
+        'db_time_ms': round(g.get('db_time', 0.0) * 1000, 3),
+    }
+
+
+def instrument_engine(engine, slow_query_ms, sample_rate):
+    """Attach timing/logging listeners to one engine"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # One slot per connection: a statement that raises never reaches
+        # after_cursor_execute, and the next statement simply overwrites it
+        conn.info['query_started'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop('query_started')
+        if has_request_context():
+            g.db_queries = g.get('db_queries', 0) + 1
+            g.db_time = g.get('db_time', 0.0) + elapsed
+        else:
+            usage = request_usage.get()
+            if usage is not None:
+                usage[0] += 1
+                usage[1] += elapsed
+
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms >= slow_query_ms:
+            level = logging.WARNING
+        elif sample_rate and random.random() < sample_rate:
+            level = logging.INFO
+        else:
+            return
+        if not sql_logger.isEnabledFor(level):
+            return
+        sql_logger.log(level, 'slow query' if level == logging.WARNING else 'query', extra={'fields': {
+            'duration_ms': round(elapsed_ms, 3),
+            'statement': statement[:MAX_STATEMENT_CHARS],
+            'executemany': executemany,
+            'rowcount': cursor.rowcount,
+            'bind': engine.url.database,
+            **request_fields(),
+        }})
+
+
+def init_query_logging(app, db):
+    """Start the log queue and instrument every engine of `db`"""
+    init_log_queue(app.config['LOG_LEVEL'])
+    slow_query_ms = app.config['SLOW_QUERY_MS']
+    sample_rate = app.config['QUERY_LOG_SAMPLE_RATE']
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine, slow_query_ms, sample_rate)
+
+    @app.before_request
+    def start_request_timer():
+        g.db_queries = 0
+        g.db_time = 0.0
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        db_time_ms = g.get('db_time', 0.0) * 1000
+        response.headers.setdefault('Server-Timing', f'db;dur={db_time_ms:.1f}')
+        if db_time_ms >= slow_query_ms or (sample_rate and random.random() < sample_rate):
+            request_logger.info('request', extra={'fields': {
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.get('request_started', time.perf_counter())) * 1000, 3),
+                **request_fields(),
+            }})
+        return response
@@ -1,7 +1,10 @@
-from . import donors, donations, inventory, dashboard
+from . import donors, donations, inventory, dashboard, export, forecast, internal
 
 def register_routes(app):
     app.register_blueprint(donors.bp)
     app.register_blueprint(donations.bp)
     app.register_blueprint(inventory.bp)
-    app.register_blueprint(dashboard.bp)
\ No newline at end of file
+    app.register_blueprint(dashboard.bp)
+    app.register_blueprint(export.bp)
+    app.register_blueprint(forecast.bp)
+    app.register_blueprint(internal.bp)
\ No newline at end of file
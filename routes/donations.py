@@ -1,16 +1,70 @@
-from flask import Blueprint, request, jsonify
-from models import db, Donation, Donor, BloodInventory
+import logging
+import math
+
+from flask import Blueprint, current_app, request, jsonify
+from sqlalchemy import insert
+from models import (
+    db, Donation, Donor, BloodInventory, DONATION_INTERVAL_DAYS, SHELF_LIFE_DAYS, DONATION_ROWS,
+    oversized_fields
+)
+from cache import STATS_KEYS, invalidate_on_commit
+from conditional import table_etag
+from inventory_summary import add_delta, new_deltas, record_deltas
+from pagination import PaginationError, paginate, wants_pagination
 from datetime import datetime, timedelta
 
 bp = Blueprint("donations", __name__, url_prefix="/api/donations")
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ["donor_id", "donation_date", "quantity_ml", "hemoglobin", "blood_pressure"]
+MIN_HEMOGLOBIN = 12.5
+MAX_INTEGER = 2**31 - 1
+
+
+def missing_fields(data):
+    """Required donation fields that are absent or null."""
+    return [field for field in REQUIRED_FIELDS if field not in data or data[field] is None]
+
+
+def format_error(record, hemoglobin, quantity_ml):
+    """Why a bulk row's values won't fit the donations columns, or None."""
+    if not math.isfinite(hemoglobin):
+        return "Hemoglobin must be a finite number"
+    if isinstance(record["quantity_ml"], float) and not record["quantity_ml"].is_integer():
+        return "Quantity must be a whole number of ml"
+    if not 0 < quantity_ml <= MAX_INTEGER:
+        return "Quantity must be a positive number of ml"
+    if not isinstance(record["blood_pressure"], str):
+        return "Blood pressure must be a string"
+    if not isinstance(record.get("notes") or "", str):
+        return "Notes must be a string"
+    return None
+
+
+def eligibility_error(donor, hemoglobin, now):
+    """Why `donor` can't donate now (hemoglobin and 90-day rules), or None."""
+    if hemoglobin < MIN_HEMOGLOBIN:
+        return f"Hemoglobin must be at least {MIN_HEMOGLOBIN} g/dL"
+    if donor.last_donation:
+        days_since = (now - donor.last_donation).days
+        if days_since < DONATION_INTERVAL_DAYS:
+            return f"Donor must wait {DONATION_INTERVAL_DAYS - days_since} more days before donating"
+    return None
 
 
 @bp.route("", methods=["GET"])
+@table_etag(Donation, Donor)
 def get_all_donations():
-    """Get all donations."""
+    """Get all donations (keyset-paginated when limit/cursor/fields is given)."""
     try:
-        donations = Donation.query.all()
-        return jsonify([donation.to_dict() for donation in donations])
+        if wants_pagination(request.args):
+            return jsonify(paginate(
+                db.session, DONATION_ROWS.select(), DONATION_ROWS, [Donation.id], request.args
+            ))
+        serialize = DONATION_ROWS.serializer()
+        return jsonify([serialize(row) for row in db.session.execute(DONATION_ROWS.select())])
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -29,8 +83,9 @@ def get_donation(donation_id):
 def get_donor_donations(donor_id):
     """Get all donations by a specific donor."""
     try:
-        donations = Donation.query.filter_by(donor_id=donor_id).all()
-        return jsonify([donation.to_dict() for donation in donations])
+        rows = db.session.execute(DONATION_ROWS.select().where(Donation.donor_id == donor_id))
+        serialize = DONATION_ROWS.serializer()
+        return jsonify([serialize(row) for row in rows])
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -41,11 +96,8 @@ def record_donation():
     try:
         data = request.get_json()
 
-        print("Received donation data:", data)  # Debug log
-
         # Validate required fields
-        required_fields = ["donor_id", "donation_date", "quantity_ml", "hemoglobin", "blood_pressure"]
-        missing = [field for field in required_fields if field not in data or data[field] is None]
+        missing = missing_fields(data)
 
         if missing:
             return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
@@ -55,17 +107,10 @@ def record_donation():
         if not donor:
             return jsonify({"error": "Donor not found"}), 404
 
-        # Validate hemoglobin (minimum 12.5)
-        if float(data["hemoglobin"]) < 12.5:
-            return jsonify({"error": "Hemoglobin must be at least 12.5 g/dL"}), 400
-
-        # Check 90-day rule
-        if donor.last_donation:
-            days_since = (datetime.utcnow() - donor.last_donation).days
-            if days_since < 90:
-                return jsonify({
-                    "error": f"Donor must wait {90 - days_since} more days before donating"
-                }), 400
+        # Validate hemoglobin and the 90-day rule
+        error = eligibility_error(donor, float(data["hemoglobin"]), datetime.utcnow())
+        if error:
+            return jsonify({"error": error}), 400
 
         # Parse donation date
         donation_date = datetime.strptime(data["donation_date"], "%Y-%m-%d")
@@ -87,7 +132,7 @@ def record_donation():
         db.session.flush()  # Get donation ID before creating inventory
 
         # Add to blood inventory (one unit per donation record)
-        expiry_date = donation_date + timedelta(days=35)
+        expiry_date = donation_date + timedelta(days=SHELF_LIFE_DAYS)
 
         new_inventory = BloodInventory(
             blood_type=donor.blood_type,
@@ -107,6 +152,7 @@ def record_donation():
         donor.last_donation = donation_date
         donor.updated_at = datetime.utcnow()
 
+        invalidate_on_commit(db.session, *STATS_KEYS)
         db.session.commit()
 
         return jsonify({
@@ -119,7 +165,141 @@ def record_donation():
         return jsonify({"error": f"Invalid data format: {str(e)}"}), 400
     except Exception as e:
         db.session.rollback()
-        print("Donation error:", str(e))  # Debug log
+        logger.exception("Failed to record donation")
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/bulk", methods=["POST"])
+def record_donations_bulk():
+    """Record a batch of donations; invalid rows are reported, not fatal.
+
+    Accepts a JSON array (or {"donations": [...]}) of the same objects as
+    /record. Donors are loaded with one IN query, rules are applied per row
+    in memory, and the valid rows are inserted with two executemany
+    statements (donations, then inventory units).
+    """
+    try:
+        data = request.get_json(silent=True)
+        records = data.get("donations") if isinstance(data, dict) else data
+
+        if not isinstance(records, list) or not records:
+            return jsonify({"error": "Expected a non-empty list of donations"}), 400
+
+        max_rows = current_app.config["BULK_MAX_ROWS"]
+        if len(records) > max_rows:
+            return jsonify({"error": f"At most {max_rows} donations per batch"}), 413
+
+        donor_ids = set()
+        for record in records:
+            try:
+                donor_ids.add(int(record["donor_id"]))
+            except (KeyError, TypeError, ValueError):
+                pass
+        donors = {donor.id: donor for donor in Donor.query.filter(Donor.id.in_(donor_ids))}
+
+        now = datetime.utcnow()
+        errors = []
+        accepted = []
+
+        for index, record in enumerate(records):
+            if not isinstance(record, dict):
+                errors.append({"index": index, "error": "Each donation must be an object"})
+                continue
+
+            missing = missing_fields(record)
+            if missing:
+                errors.append({"index": index, "error": f"Missing required fields: {', '.join(missing)}"})
+                continue
+
+            try:
+                donor = donors.get(int(record["donor_id"]))
+                hemoglobin = float(record["hemoglobin"])
+                quantity_ml = int(record["quantity_ml"])
+                donation_date = datetime.strptime(record["donation_date"], "%Y-%m-%d")
+            except (TypeError, ValueError) as e:
+                errors.append({"index": index, "error": f"Invalid data format: {str(e)}"})
+                continue
+
+            if not donor:
+                errors.append({"index": index, "error": "Donor not found"})
+                continue
+
+            # One bad value would otherwise fail the whole executemany
+            error = format_error(record, hemoglobin, quantity_ml)
+            if error:
+                errors.append({"index": index, "error": error})
+                continue
+            row = {
+                "donor_id": donor.id,
+                "donation_date": donation_date,
+                "quantity_ml": quantity_ml,
+                "hemoglobin": hemoglobin,
+                "blood_pressure": record["blood_pressure"],
+                "notes": record.get("notes") or "",
+                "recorded_at": now,
+                "created_at": now,
+                "updated_at": now
+            }
+            too_long = oversized_fields(Donation, row)
+            if too_long:
+                errors.append({"index": index, "error": f"Too long: {', '.join(too_long)}"})
+                continue
+
+            error = eligibility_error(donor, hemoglobin, now)
+            if error:
+                errors.append({"index": index, "error": error})
+                continue
+
+            # Later rows for the same donor are checked against this one
+            donor.last_donation = donation_date
+            donor.updated_at = now
+
+            accepted.append((index, donor, row))
+
+        created = []
+        if accepted:
+            donation_ids = db.session.scalars(
+                insert(Donation).returning(Donation.id, sort_by_parameter_order=True),
+                [row for _, _, row in accepted]
+            ).all()
+
+            inventory_ids = db.session.scalars(
+                insert(BloodInventory).returning(BloodInventory.id, sort_by_parameter_order=True),
+                [{
+                    "blood_type": donor.blood_type,
+                    "quantity_ml": row["quantity_ml"],
+                    "donation_id": donation_id,
+                    "donation_date": row["donation_date"],
+                    "expiry_date": row["donation_date"] + timedelta(days=SHELF_LIFE_DAYS),
+                    "status": "available",
+                    "added_at": now,
+                    "created_at": now,
+                    "updated_at": now
+                } for (_, donor, row), donation_id in zip(accepted, donation_ids)]
+            ).all()
+
+            # Bulk inserts bypass the flush hook, so update the counters here
+            deltas = new_deltas()
+            for _, donor, row in accepted:
+                add_delta(deltas, donor.blood_type, "available", 1, row["quantity_ml"])
+            record_deltas(db.session, deltas, now)
+
+            created = [
+                {"index": index, "donation_id": donation_id, "inventory_id": inventory_id}
+                for (index, _, _), donation_id, inventory_id in zip(accepted, donation_ids, inventory_ids)
+            ]
+
+        invalidate_on_commit(db.session, *STATS_KEYS)
+        db.session.commit()
+
+        return jsonify({
+            "message": f"Recorded {len(created)} of {len(records)} donations",
+            "created": created,
+            "errors": errors
+        }), 201 if created else 400
+
+    except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 
@@ -129,6 +309,7 @@ def delete_donation(donation_id):
     try:
         donation = Donation.query.get_or_404(donation_id)
         db.session.delete(donation)
+        invalidate_on_commit(db.session, *STATS_KEYS)
         db.session.commit()
         return jsonify({"message": "Donation deleted successfully"}), 200
     except Exception as e:
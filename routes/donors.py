@@ -1,15 +1,103 @@
-from flask import Blueprint, request, jsonify
-from models import db, Donor
+import csv
+import io
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from models import db, Donor, Donation, BLOOD_TYPES, DONOR_ROWS, oversized_fields
+from cache import STATS_KEYS, invalidate_on_commit
+from conditional import table_etag
+from eligibility import RECALL_COLUMNS, eligible_at, eligible_counts, eligible_donors, parse_blood_types
+from pagination import PaginationError, paginate, wants_pagination
+from routes.export import EXPORT_FORMATS, csv_lines, ndjson_lines
+from search import search_donors
 from datetime import datetime, timedelta
 
 bp = Blueprint('donors', __name__, url_prefix='/api/donors')
 
+REQUIRED_FIELDS = ['name', 'age', 'email', 'phone', 'blood_type']
+MIN_AGE = 18
+MAX_AGE = 65
+BULK_INSERT_CHUNK = 500
+ELIGIBLE_VALUES = {'true': True, 'false': False}
+
 @bp.route('', methods=['GET'])
+@table_etag(Donor, Donation)
 def get_all_donors():
-    """Get all donors"""
+    """Get all donors (keyset-paginated when limit/cursor/fields is given)"""
+    try:
+        if wants_pagination(request.args):
+            return jsonify(paginate(
+                db.session, DONOR_ROWS.select(), DONOR_ROWS,
+                [Donor.registered_on, Donor.id], request.args
+            ))
+        serialize = DONOR_ROWS.serializer()
+        return jsonify([serialize(row) for row in db.session.execute(DONOR_ROWS.select())])
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/search', methods=['GET'])
+@table_etag(Donor, Donation, clock=True)
+def search():
+    """Ranked, paginated donor search (q, blood_type, eligible, limit, cursor)"""
+    blood_type = request.args.get('blood_type')
+    if blood_type and blood_type not in BLOOD_TYPES:
+        return jsonify({'error': f'Unknown blood type: {blood_type}'}), 400
+
+    eligible = request.args.get('eligible')
+    if eligible is not None:
+        if eligible.lower() not in ELIGIBLE_VALUES:
+            return jsonify({'error': 'eligible must be true or false'}), 400
+        eligible = ELIGIBLE_VALUES[eligible.lower()]
+
+    try:
+        return jsonify(search_donors(
+            request.args.get('q'), blood_type, eligible,
+            limit=request.args.get('limit'), cursor=request.args.get('cursor')
+        ))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/eligible', methods=['GET'])
+def stream_eligible_donors():
+    """Stream donors who can donate by `on` (default now) for the given blood types"""
     try:
-        donors = Donor.query.all()
-        return jsonify([donor.to_dict() for donor in donors])
+        blood_types = parse_blood_types(request.args.getlist('blood_type'))
+        at = eligible_at(request.args.get('on'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    generate = ndjson_lines if export_format == 'ndjson' else csv_lines
+    return Response(
+        stream_with_context(generate(RECALL_COLUMNS, eligible_donors(blood_types, at))),
+        mimetype=EXPORT_FORMATS[export_format]
+    )
+
+@bp.route('/eligible/counts', methods=['GET'])
+@table_etag(Donor, clock=True)
+def count_eligible_donors():
+    """Eligible donor counts per blood type by `on` (default now)"""
+    try:
+        blood_types = parse_blood_types(request.args.getlist('blood_type'))
+        at = eligible_at(request.args.get('on'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        counts = eligible_counts(blood_types, at)
+        return jsonify({
+            'as_of': at.isoformat(),
+            'counts': counts,
+            'total': sum(counts.values())
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -29,12 +117,12 @@ def register_donor():
         data = request.get_json()
         
         # Validate required fields
-        if not all(k in data for k in ['name', 'age', 'email', 'phone', 'blood_type']):
+        if not all(k in data for k in REQUIRED_FIELDS):
             return jsonify({'error': 'Missing required fields'}), 400
         
         # Validate age
-        if not (18 <= data['age'] <= 65):
-            return jsonify({'error': 'Age must be between 18 and 65'}), 400
+        if not (MIN_AGE <= data['age'] <= MAX_AGE):
+            return jsonify({'error': f'Age must be between {MIN_AGE} and {MAX_AGE}'}), 400
         
         # Check if email already exists
         if Donor.query.filter_by(email=data['email']).first():
@@ -59,6 +147,7 @@ def register_donor():
         )
         
         db.session.add(new_donor)
+        invalidate_on_commit(db.session, *STATS_KEYS)
         db.session.commit()
         
         return jsonify({
@@ -70,6 +159,152 @@ def register_donor():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def read_bulk_donors():
+    """Donor rows from a JSON array, a CSV upload (`file`) or a text/csv body"""
+    upload = request.files.get('file')
+    if upload is not None or request.mimetype == 'text/csv':
+        raw = upload.read() if upload is not None else request.get_data()
+        return list(csv.DictReader(io.StringIO(raw.decode('utf-8-sig'))))
+
+    data = request.get_json(silent=True)
+    return data.get('donors') if isinstance(data, dict) else data
+
+
+def insert_donor_rows(rows):
+    """Insert (index, row) pairs in multi-row chunks; returns (created, errors).
+
+    A chunk that the database rejects (a concurrent registration slipped in
+    after the duplicate check, or a value the in-memory checks let through)
+    is retried row by row so only the offending rows fail.
+    """
+    created = []
+    errors = []
+    statement = insert(Donor).returning(Donor.id, sort_by_parameter_order=True)
+
+    for start in range(0, len(rows), BULK_INSERT_CHUNK):
+        chunk = rows[start:start + BULK_INSERT_CHUNK]
+        try:
+            with db.session.begin_nested():
+                ids = db.session.scalars(statement, [row for _, row in chunk]).all()
+            created.extend({'index': index, 'id': donor_id} for (index, _), donor_id in zip(chunk, ids))
+            continue
+        except DBAPIError:
+            pass
+
+        for index, row in chunk:
+            try:
+                with db.session.begin_nested():
+                    donor_id = db.session.scalars(statement, [row]).one()
+                created.append({'index': index, 'id': donor_id})
+            except IntegrityError:
+                errors.append({'index': index, 'error': 'Email or phone number already registered'})
+            except DBAPIError as e:
+                errors.append({'index': index, 'error': f'Invalid values: {e.orig}'})
+
+    return created, errors
+
+
+@bp.route('/bulk', methods=['POST'])
+def register_donors_bulk():
+    """Register many donors at once with a per-row outcome report"""
+    try:
+        try:
+            records = read_bulk_donors()
+        except (UnicodeDecodeError, csv.Error) as e:
+            return jsonify({'error': f'Invalid CSV: {str(e)}'}), 400
+
+        if not isinstance(records, list) or not records:
+            return jsonify({'error': 'Expected a non-empty list of donors'}), 400
+
+        max_rows = current_app.config['BULK_MAX_ROWS']
+        if len(records) > max_rows:
+            return jsonify({'error': f'At most {max_rows} donors per batch'}), 413
+
+        now = datetime.utcnow()
+        errors = []
+        candidates = []
+
+        for index, record in enumerate(records):
+            if not isinstance(record, dict) or not all(record.get(k) not in (None, '') for k in REQUIRED_FIELDS):
+                errors.append({'index': index, 'error': 'Missing required fields'})
+                continue
+            try:
+                age = int(record['age'])
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': 'Age must be a number'})
+                continue
+            if not (MIN_AGE <= age <= MAX_AGE):
+                errors.append({'index': index, 'error': f'Age must be between {MIN_AGE} and {MAX_AGE}'})
+                continue
+            if record['blood_type'] not in BLOOD_TYPES:
+                errors.append({'index': index, 'error': f"Blood type must be one of {', '.join(BLOOD_TYPES)}"})
+                continue
+
+            row = {
+                'name': str(record['name']),
+                'age': age,
+                'email': str(record['email']).strip(),
+                'phone': str(record['phone']).strip(),
+                'blood_type': record['blood_type'],
+                'address': str(record.get('address') or ''),
+                'emergency_contact': str(record.get('emergency_contact') or ''),
+                'registered_on': now,
+                'created_at': now,
+                'updated_at': now
+            }
+            # Caught here, PostgreSQL would reject the whole chunk
+            too_long = oversized_fields(Donor, row)
+            if too_long:
+                errors.append({'index': index, 'error': f"Too long: {', '.join(too_long)}"})
+                continue
+            candidates.append((index, row))
+
+        # One set-based lookup against the unique email/phone indexes
+        emails = {row['email'] for _, row in candidates}
+        phones = {row['phone'] for _, row in candidates}
+        existing_emails = set()
+        existing_phones = set()
+        if candidates:
+            for email, phone in db.session.query(Donor.email, Donor.phone).filter(
+                or_(Donor.email.in_(emails), Donor.phone.in_(phones))
+            ):
+                existing_emails.add(email)
+                existing_phones.add(phone)
+
+        seen_emails = {}
+        seen_phones = {}
+        survivors = []
+        for index, row in candidates:
+            if row['email'] in existing_emails:
+                errors.append({'index': index, 'error': 'Email already registered'})
+            elif row['phone'] in existing_phones:
+                errors.append({'index': index, 'error': 'Phone number already registered'})
+            elif row['email'] in seen_emails:
+                errors.append({'index': index, 'error': f"Email duplicates row {seen_emails[row['email']]}"})
+            elif row['phone'] in seen_phones:
+                errors.append({'index': index, 'error': f"Phone number duplicates row {seen_phones[row['phone']]}"})
+            else:
+                seen_emails[row['email']] = index
+                seen_phones[row['phone']] = index
+                survivors.append((index, row))
+
+        created, insert_errors = insert_donor_rows(survivors)
+        errors.extend(insert_errors)
+        errors.sort(key=lambda error: error['index'])
+
+        invalidate_on_commit(db.session, *STATS_KEYS)
+        db.session.commit()
+
+        return jsonify({
+            'message': f'Registered {len(created)} of {len(records)} donors',
+            'created': created,
+            'errors': errors
+        }), 201 if created else 400
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/<int:donor_id>', methods=['PUT'])
 def update_donor(donor_id):
     """Update donor information"""
@@ -80,8 +315,8 @@ def update_donor(donor_id):
         if 'name' in data:
             donor.name = data['name']
         if 'age' in data:
-            if not (18 <= data['age'] <= 65):
-                return jsonify({'error': 'Age must be between 18 and 65'}), 400
+            if not (MIN_AGE <= data['age'] <= MAX_AGE):
+                return jsonify({'error': f'Age must be between {MIN_AGE} and {MAX_AGE}'}), 400
             donor.age = data['age']
         if 'phone' in data:
             donor.phone = data['phone']
@@ -106,6 +341,7 @@ def delete_donor(donor_id):
     try:
         donor = Donor.query.get_or_404(donor_id)
         db.session.delete(donor)
+        invalidate_on_commit(db.session, *STATS_KEYS)
         db.session.commit()
         return jsonify({'message': 'Donor deleted successfully'}), 200
     
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy import select
+from models import db, Donor, Donation, BloodInventory
+from serializers import row_to_dict, serialize_value
+
+bp = Blueprint('export', __name__, url_prefix='/api/export')
+
+EXPORT_TABLES = {
+    'donors': Donor,
+    'donations': Donation,
+    'inventory': BloodInventory,
+}
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CHUNK_ROWS = 1000
+
+
+def stream_rows(statement):
+    """Yield result partitions from a server-side cursor, one chunk at a time"""
+    result = db.session.execute(statement.execution_options(yield_per=CHUNK_ROWS))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def ndjson_lines(keys, statement):
+    for partition in stream_rows(statement):
+        yield ''.join(json.dumps(row_to_dict(keys, row)) + '\n' for row in partition)
+
+
+def csv_lines(keys, statement):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(keys)
+    yield flush()
+    for partition in stream_rows(statement):
+        writer.writerows([serialize_value(value) for value in row] for row in partition)
+        yield flush()
+
+
+@bp.route('/<table>', methods=['GET'])
+def export_table(table):
+    """Stream every row of a table as NDJSON (default) or CSV"""
+    model = EXPORT_TABLES.get(table)
+    if model is None:
+        return jsonify({'error': f'Unknown table: {table}'}), 404
+
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    keys = model.__table__.columns.keys()
+    statement = select(*[getattr(model, key) for key in keys]).order_by(model.id)
+    generate = ndjson_lines if export_format == 'ndjson' else csv_lines
+
+    return Response(
+        stream_with_context(generate(keys, statement)),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={table}.{export_format}'}
+    )
@@ -0,0 +1,36 @@
+from flask import Blueprint, current_app, jsonify, request
+from cache import FORECAST, cached
+from conditional import body_etag, version_etag, version_query
+from eligibility import parse_blood_types
+from forecast import MAX_HORIZON_DAYS, compute_forecast, trim_forecast
+from models import db, BloodInventory
+
+bp = Blueprint('forecast', __name__, url_prefix='/api/forecast')
+
+MAX_WEEKS = MAX_HORIZON_DAYS // 7
+
+@bp.route('', methods=['GET'])
+@body_etag
+def get_forecast():
+    """Projected stock per blood type over the next `weeks` (1-4) weeks"""
+    try:
+        weeks = int(request.args.get('weeks', MAX_WEEKS))
+    except ValueError:
+        weeks = 0
+    if not 1 <= weeks <= MAX_WEEKS:
+        return jsonify({'error': f'weeks must be between 1 and {MAX_WEEKS}'}), 400
+    try:
+        blood_types = parse_blood_types(request.args.getlist('blood_type'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        # Every inventory write moves the stamp, whichever worker made it
+        row = db.session.execute(version_query(BloodInventory)).one()
+        forecast = cached(
+            FORECAST, compute_forecast, current_app.config['FORECAST_CACHE_TTL'],
+            version_etag(row, FORECAST)
+        )
+        return jsonify(trim_forecast(forecast, weeks * 7, blood_types))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,12 @@
+from flask import Blueprint, jsonify
+from internal_access import internal_access_denied
+from models import db
+from pool_stats import all_pool_status
+
+bp = Blueprint('internal', __name__, url_prefix='/internal')
+bp.before_request(internal_access_denied)
+
+@bp.route('/pool', methods=['GET'])
+def get_pool_status():
+    """Connection pool statistics for the worker serving this request"""
+    return jsonify(all_pool_status(db.engines))
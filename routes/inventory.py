@@ -1,14 +1,65 @@
-from flask import Blueprint, request, jsonify
-from models import db, BloodInventory
+import threading
+
+from flask import Blueprint, Response, current_app, request, jsonify
+from models import db, BloodInventory, BLOOD_TYPES, INVENTORY_ROWS
+from aggregates import dashboard_stats
+from allocation import AllocationError, allocate_units
+from cache import DASHBOARD_STATS, STATS_KEYS, cached, invalidate_on_commit
+from conditional import table_etag
+from expiry import metrics as expiry_metrics, sweep_expired
+from inventory_events import ensure_listener, event_stream
+from pagination import PaginationError, paginate, wants_pagination
 from datetime import datetime
 
 bp = Blueprint('inventory', __name__, url_prefix='/api/inventory')
 
+@bp.record_once
+def init_stream_slots(state):
+    # Each open stream pins a WSGI request thread until its tab closes
+    limit = max(state.app.config['INVENTORY_STREAMS_PER_WORKER'], 0)
+    state.app.extensions['inventory_stream_slots'] = threading.BoundedSemaphore(limit)
+
 @bp.route('', methods=['GET'])
+@table_etag(BloodInventory, clock=True)
 def get_inventory():
-    """Get all blood inventory"""
-    inventory = BloodInventory.query.filter_by(status='available').all()
-    return jsonify([item.to_dict() for item in inventory])
+    """Get all blood inventory (keyset-paginated when limit/cursor/fields is given)"""
+    statement = INVENTORY_ROWS.select().where(BloodInventory.status == 'available')
+    if wants_pagination(request.args):
+        try:
+            return jsonify(paginate(
+                db.session, statement, INVENTORY_ROWS,
+                [BloodInventory.expiry_date, BloodInventory.id], request.args
+            ))
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+    serialize = INVENTORY_ROWS.serializer()
+    return jsonify([serialize(row) for row in db.session.execute(statement)])
+
+@bp.route('/stream', methods=['GET'])
+def stream_inventory():
+    """Server-sent events: a dashboard snapshot, then per-blood-type deltas.
+
+    Capped at INVENTORY_STREAMS_PER_WORKER (none by default); past the cap
+    the page keeps its one-shot fetch. asgi.py serves streams without a thread.
+    """
+    app = current_app._get_current_object()
+    slots = app.extensions['inventory_stream_slots']
+    if not slots.acquire(blocking=False):
+        return jsonify({'error': 'Live updates are not available on this worker'}), 503
+    ensure_listener(db.engine)
+
+    def snapshot():
+        # Runs inside the generator, after this request's context is gone
+        with app.app_context():
+            return cached(DASHBOARD_STATS, dashboard_stats)
+
+    response = Response(event_stream(snapshot), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # The server closes the response when the client goes away
+    response.call_on_close(slots.release)
+    return response
 
 @bp.route('/<int:inventory_id>', methods=['GET'])
 def get_inventory_item(inventory_id):
@@ -17,13 +68,15 @@ def get_inventory_item(inventory_id):
     return jsonify(item.to_dict())
 
 @bp.route('/blood-type/<blood_type>', methods=['GET'])
+@table_etag(BloodInventory, clock=True)
 def get_by_blood_type(blood_type):
     """Get all available units of a specific blood type"""
-    inventory = BloodInventory.query.filter_by(
-        blood_type=blood_type,
-        status='available'
-    ).all()
-    return jsonify([item.to_dict() for item in inventory])
+    rows = db.session.execute(INVENTORY_ROWS.select().where(
+        BloodInventory.blood_type == blood_type,
+        BloodInventory.status == 'available'
+    ))
+    serialize = INVENTORY_ROWS.serializer()
+    return jsonify([serialize(row) for row in rows])
 
 @bp.route('/use/<int:inventory_id>', methods=['PUT'])
 def use_blood_unit(inventory_id):
@@ -40,6 +93,7 @@ def use_blood_unit(inventory_id):
         item.status = 'used'
         item.used_at = datetime.utcnow()
         
+        invalidate_on_commit(db.session, *STATS_KEYS)
         db.session.commit()
         return jsonify({
             'message': 'Blood unit marked as used',
@@ -50,15 +104,96 @@ def use_blood_unit(inventory_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/allocate', methods=['POST'])
+def allocate_blood_units():
+    """Reserve compatible units for a recipient, first-expiring-first-out"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        if 'blood_type' not in data:
+            return jsonify({'error': 'Missing required fields: blood_type'}), 400
+        if data['blood_type'] not in BLOOD_TYPES:
+            return jsonify({'error': f"Unknown blood type: {data['blood_type']}"}), 400
+        
+        try:
+            quantity = int(data.get('quantity', 1))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'quantity must be an integer'}), 400
+        if quantity < 1:
+            return jsonify({'error': 'quantity must be at least 1'}), 400
+        
+        units = allocate_units(
+            db.session, data['blood_type'], quantity,
+            allow_partial=bool(data.get('allow_partial', False))
+        )
+        db.session.commit()
+        
+        return jsonify({
+            'message': f'Reserved {len(units)} units',
+            'recipient_blood_type': data['blood_type'],
+            'requested': quantity,
+            'allocated': len(units),
+            'units': [unit.to_dict() for unit in units]
+        }), 201
+    
+    except AllocationError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'available': e.available}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/release/<int:inventory_id>', methods=['PUT'])
+def release_blood_unit(inventory_id):
+    """Return a reserved blood unit to available stock"""
+    try:
+        item = BloodInventory.query.get_or_404(inventory_id)
+        
+        if item.status != 'reserved':
+            return jsonify({'error': 'Blood unit is not reserved'}), 400
+        
+        item.status = 'available'
+        
+        invalidate_on_commit(db.session, *STATS_KEYS)
+        db.session.commit()
+        return jsonify({
+            'message': 'Blood unit released',
+            'inventory': item.to_dict()
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/<int:inventory_id>', methods=['DELETE'])
 def delete_inventory(inventory_id):
     """Delete an inventory record"""
     try:
         item = BloodInventory.query.get_or_404(inventory_id)
         db.session.delete(item)
+        invalidate_on_commit(db.session, *STATS_KEYS)
         db.session.commit()
         return jsonify({'message': 'Inventory record deleted'}), 200
     
     except Exception as e:
         db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/expiry-sweep', methods=['GET'])
+def get_expiry_sweep_metrics():
+    """Metrics from this worker's expiry sweeps"""
+    return jsonify(expiry_metrics.to_dict())
+
+@bp.route('/expiry-sweep', methods=['POST'])
+def run_expiry_sweep():
+    """Mark every overdue available unit as expired"""
+    try:
+        expired = sweep_expired(db.session, current_app.config['EXPIRY_SWEEP_BATCH_SIZE'])
+        return jsonify({
+            'message': f'Marked {expired} units as expired',
+            'expired': expired,
+            'metrics': expiry_metrics.to_dict()
+        })
+    
+    except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""Read-replica routing for read-only requests.
+
+When DATABASE_REPLICA_URL is set, GET requests to the read blueprints run
+their queries on the 'replica' bind. Writes, flushes and any request made
+within REPLICA_STICKY_SECONDS of the client's own write (tracked with a
+cookie) stay on the primary. A replica error marks it down for
+REPLICA_RETRY_SECONDS and the failed read is re-run on the primary.
+"""
+import functools
+import threading
+import time
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+
+REPLICA_BIND = 'replica'
+READ_BLUEPRINTS = {'donors', 'donations', 'inventory', 'dashboard', 'export', 'forecast'}
+READ_ENDPOINTS = {'get_stats'}
+READ_METHODS = {'GET', 'HEAD'}
+WROTE_COOKIE = 'hemobank_wrote'
+
+_SESSION_FLAG = 'use_replica'
+
+
+class RoutingSession(FlaskSession):
+    """Session that sends reads to the replica when the request allows it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get(_SESSION_FLAG) and not self._has_writes():
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _has_writes(self):
+        return self._flushing or bool(self.new) or bool(self.dirty) or bool(self.deleted)
+
+
+class ReplicaHealth:
+    """Tracks whether the replica may be used, with a retry back-off"""
+
+    def __init__(self, engine, retry_seconds, probe_interval):
+        self.engine = engine
+        self.retry_seconds = retry_seconds
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        self._probed_at = 0.0
+
+    def mark_down(self):
+        with self._lock:
+            self._down_until = time.monotonic() + self.retry_seconds
+
+    def available(self):
+        now = time.monotonic()
+        with self._lock:
+            if now < self._down_until:
+                return False
+            if now - self._probed_at < self.probe_interval:
+                return True
+            self._probed_at = now
+        try:
+            with self.engine.connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+            return True
+        except DBAPIError:
+            self.mark_down()
+            return False
+
+
+def reads_from_replica(session):
+    """Whether `session` currently routes this request's reads to the replica"""
+    return bool(session.info.get(_SESSION_FLAG))
+
+
+def is_read_request():
+    if request.method not in READ_METHODS or request.cookies.get(WROTE_COOKIE):
+        return False
+    return request.blueprint in READ_BLUEPRINTS or request.endpoint in READ_ENDPOINTS
+
+
+def _replica_failed(db):
+    return g.pop('replica_failed', False) and db.session.info.get(_SESSION_FLAG)
+
+
+def _retry_on_primary(view, db):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        # The replica error either escaped the view or was turned into an
+        # error response by the view's own try/except
+        try:
+            response = view(*args, **kwargs)
+        except DBAPIError:
+            if not _replica_failed(db):
+                raise
+        else:
+            if not _replica_failed(db):
+                return response
+        db.session.rollback()
+        db.session.info[_SESSION_FLAG] = False
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_replica_routing(app, db):
+    """Wire up routing if a 'replica' bind is configured"""
+    with app.app_context():
+        replica = db.engines.get(REPLICA_BIND)
+    if replica is None:
+        return
+
+    health = ReplicaHealth(
+        replica,
+        app.config['REPLICA_RETRY_SECONDS'],
+        app.config['REPLICA_PROBE_INTERVAL']
+    )
+    app.extensions['replica_health'] = health
+
+    @event.listens_for(replica, 'handle_error')
+    def replica_error(context):
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, DBAPIError):
+            health.mark_down()
+            if has_request_context():
+                g.replica_failed = True
+
+    @app.before_request
+    def route_reads():
+        db.session.info[_SESSION_FLAG] = is_read_request() and health.available()
+
+    @app.after_request
+    def remember_writes(response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            response.set_cookie(
+                WROTE_COOKIE, '1',
+                max_age=app.config['REPLICA_STICKY_SECONDS'],
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    for endpoint, view in list(app.view_functions.items()):
+        blueprint = endpoint.rpartition('.')[0]
+        if blueprint in READ_BLUEPRINTS or endpoint in READ_ENDPOINTS:
+            app.view_functions[endpoint] = _retry_on_primary(view, db)
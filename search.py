@@ -0,0 +1,159 @@
+"""Ranked donor search behind GET /api/donors/search.
+
+Matches `q` against name, email and phone, case-insensitively:
+
+- PostgreSQL (pg_trgm): substring matches plus fuzzy word matches on name
+  (`name %> q`, typo tolerant), served by the trigram GIN indexes. Ranked by
+  prefix match, then trigram word similarity.
+- SQLite (FTS5, trigram tokenizer): substring matches through the
+  donors_search index, ranked by prefix match, then bm25. FTS5 has no
+  similarity operator, so typos are not forgiven here. Queries shorter than
+  a trigram use a prefix LIKE.
+- Anything else, or a database where `flask db-upgrade` has not created the
+  indexes yet: a LIKE scan, ranked by prefix match. A missing index is
+  looked for again every REPROBE_SECONDS, so an upgrade takes effect
+  without a restart.
+
+Ranked results are paged by offset; the opaque cursor carries it.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import case, column, func, literal_column, or_, select, table, text
+
+from models import db, Donor, DONOR_ROWS
+from pagination import decode_offset_cursor, encode_cursor, parse_limit
+
+SEARCH_TABLE = 'donors_search'
+TRIGRAM = 3
+REPROBE_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+# database URL -> (backend, monotonic time it was probed)
+_backends = {}
+_degraded = set()
+_backends_lock = threading.Lock()
+
+_fts = table(SEARCH_TABLE, column('rowid'))
+_fts_self = literal_column(SEARCH_TABLE)
+
+
+def _probe(connection):
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        found = connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+        return 'trigram' if found else 'like'
+    if dialect == 'sqlite':
+        found = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': SEARCH_TABLE}
+        ).first()
+        return 'fts5' if found else 'like'
+    return 'like'
+
+
+def search_backend(connection):
+    """'trigram', 'fts5' or 'like' for the connection's database.
+
+    An indexed backend is kept for the life of the process; 'like' only for
+    REPROBE_SECONDS.
+    """
+    key = str(connection.engine.url)
+    entry = _backends.get(key)
+    if entry is not None and (entry[0] != 'like' or time.monotonic() - entry[1] < REPROBE_SECONDS):
+        return entry[0]
+
+    backend = _probe(connection)
+    with _backends_lock:
+        _backends[key] = (backend, time.monotonic())
+        degraded = backend == 'like' and key not in _degraded
+        if degraded:
+            _degraded.add(key)
+        elif backend != 'like':
+            _degraded.discard(key)
+    if degraded:
+        logger.warning('Donor search indexes missing on %s; falling back to a LIKE scan '
+                       'until `flask db-upgrade` creates them', connection.dialect.name)
+    return backend
+
+
+def _starts(q):
+    return or_(
+        Donor.name.istartswith(q, autoescape=True),
+        Donor.email.istartswith(q, autoescape=True),
+        Donor.phone.startswith(q, autoescape=True)
+    )
+
+
+def _prefix_rank(q):
+    return case((_starts(q), 1.0), else_=0.0)
+
+
+def _contains(q):
+    return or_(
+        Donor.name.icontains(q, autoescape=True),
+        Donor.email.icontains(q, autoescape=True),
+        Donor.phone.contains(q, autoescape=True)
+    )
+
+
+def _match(backend, q):
+    """(statement, rank) selecting donors that match `q`; rank None means id order"""
+    statement = DONOR_ROWS.select()
+    if backend == 'trigram':
+        similarity = func.greatest(
+            func.word_similarity(q, Donor.name),
+            func.word_similarity(q, Donor.email),
+            func.word_similarity(q, Donor.phone)
+        )
+        return (statement.where(or_(_contains(q), Donor.name.op('%>')(q))),
+                _prefix_rank(q) + similarity)
+    if backend == 'fts5' and len(q) >= TRIGRAM:
+        phrase = '"' + q.replace('"', '""') + '"'
+        matches = (
+            select(_fts.c.rowid.label('id'), func.bm25(_fts_self).label('score'))
+            .where(_fts_self.op('MATCH')(phrase))
+            .subquery()
+        )
+        # bm25 is lower-is-better
+        return (statement.join(matches, matches.c.id == Donor.id),
+                _prefix_rank(q) - matches.c.score)
+    if backend == 'fts5':
+        # Every hit is a prefix hit, so id order lets the scan stop at `limit`
+        return statement.where(_starts(q)), None
+    return statement.where(_contains(q)), _prefix_rank(q)
+
+
+def search_donors(q, blood_type=None, eligible=None, now=None, limit=None, cursor=None):
+    """One page of donors matching `q` (may be empty) and the filters.
+
+    `eligible` is True/False to keep only donors who can / cannot donate at
+    `now`. Returns the same envelope as the keyset-paginated list endpoints.
+    """
+    limit = parse_limit(limit)
+    offset = decode_offset_cursor(cursor) if cursor else 0
+    q = (q or '').strip()
+
+    if q:
+        backend = search_backend(db.session.connection())
+        statement, rank = _match(backend, q)
+        statement = statement.order_by(Donor.id) if rank is None else statement.order_by(rank.desc(), Donor.id)
+    else:
+        statement = DONOR_ROWS.select().order_by(Donor.id)
+    if blood_type:
+        statement = statement.where(Donor.blood_type == blood_type)
+    if eligible is not None:
+        clause = Donor.eligible_clause(now or datetime.utcnow())
+        statement = statement.where(clause if eligible else ~clause)
+
+    rows = db.session.execute(statement.offset(offset).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    serialize = DONOR_ROWS.serializer()
+    return {
+        'items': [serialize(row) for row in rows[:limit]],
+        'next_cursor': encode_cursor([offset + limit]) if has_more else None,
+        'limit': limit
+    }
+
@@ -0,0 +1,51 @@
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+
+def serialize_value(value):
+    """Convert a column value into something jsonify can emit"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def row_to_dict(keys, row):
+    """Serialize a column tuple (e.g. a projected Row) keyed by `keys`"""
+    return {key: serialize_value(value) for key, value in zip(keys, row)}
+
+
+class RowShape:
+    """A model's to_dict() as one column-tuple select, without ORM instances.
+
+    `columns` are labeled with their to_dict() keys; `joins` are
+    (target, onclause) outer joins for columns of related models; `derived`
+    adds the computed keys from an item dict and a single `now`. Dates stay
+    datetime objects: the app's JSON provider writes them as ISO 8601.
+    """
+
+    def __init__(self, model, columns, joins=(), derived=None):
+        self.model = model
+        self.columns = columns
+        self.joins = joins
+        self.derived = derived
+        self.keys = [column.key for column in columns]
+
+    def select(self):
+        statement = select(*self.columns).select_from(self.model)
+        for target, onclause in self.joins:
+            statement = statement.outerjoin(target, onclause)
+        return statement
+
+    def serializer(self, now=None):
+        """Row -> dict function, with `now` (default: utcnow) fixed for every row"""
+        keys, derived = self.keys, self.derived
+        if derived is None:
+            return lambda row: dict(zip(keys, row))
+        now = now or datetime.utcnow()
+
+        def serialize(row):
+            item = dict(zip(keys, row))
+            derived(item, now)
+            return item
+        return serialize
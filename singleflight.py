@@ -0,0 +1,144 @@
+"""Request coalescing ("single flight") for expensive reads.
+
+When a burst of identical requests misses the cache together (a shift
+starting, every dashboard loading at once), only the first one runs the
+aggregate; the rest wait for it and share its result, so the database sees
+one query per burst instead of one per client.
+
+- SingleFlight coalesces threads inside one worker process.
+- AsyncSingleFlight does the same for coroutines on one event loop (asgi.py).
+- shared() optionally extends it across gunicorn workers on PostgreSQL: the
+  computing worker holds a transaction-level advisory lock on the key and
+  publishes the result to cache_snapshots, where workers queued on the lock
+  pick it up instead of running the query again.
+
+cache.cached() runs every cache miss through these, so any read endpoint
+using it is coalesced.
+"""
+import asyncio
+import json
+import logging
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+
+from models import CacheSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """At most one `compute` per key at a time; concurrent callers share its outcome"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute, timeout=None):
+        """compute() once for every caller that arrives while it runs.
+
+        A caller that has waited `timeout` seconds for the running call gives
+        up on it and computes on its own. The running call's exception is
+        raised to every caller sharing it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(timeout):
+                logger.warning('single-flight wait for %r timed out; computing', key)
+                return compute()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on a single event loop"""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, compute):
+        """Await compute() once for every caller that arrives while it runs"""
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(compute())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # A disconnecting caller must not cancel the others' result
+        return await asyncio.shield(task)
+
+
+def _lock_id(key):
+    return zlib.crc32(key.encode())
+
+
+def shared(engine, key, compute, max_age, not_before=None, lock_timeout=None, version=None):
+    """compute() at most once per `max_age` seconds across worker processes.
+
+    Returns (value, age in seconds). A snapshot is reused only if it is
+    younger than `max_age`, newer than `not_before` (when this worker last
+    invalidated the key), so a worker still reads its own writes, and was
+    computed at the same `version` (cache.cached). Values must round-trip
+    through JSON. Databases other than PostgreSQL,
+    and a lock wait longer than `lock_timeout` seconds, fall back to a
+    plain compute().
+    """
+    if engine.dialect.name != 'postgresql':
+        return compute(), 0.0
+    snapshots = CacheSnapshot.__table__
+
+    with engine.connect() as connection:
+        try:
+            if lock_timeout:
+                connection.exec_driver_sql(f'SET LOCAL lock_timeout = {int(lock_timeout * 1000)}')
+            connection.execute(select(func.pg_advisory_xact_lock(_lock_id(key))))
+        except DBAPIError as e:
+            logger.warning('single-flight lock for %r unavailable (%s); computing', key, e.orig)
+            return compute(), 0.0
+
+        now = datetime.utcnow()
+        fresh_after = now - timedelta(seconds=max_age)
+        if not_before and not_before > fresh_after:
+            fresh_after = not_before
+        row = connection.execute(
+            select(snapshots.c.value, snapshots.c.computed_at).where(snapshots.c.key == key)
+        ).first()
+        if row and row.computed_at > fresh_after:
+            snapshot_version, value = json.loads(row.value)
+            if snapshot_version == version:
+                return value, (now - row.computed_at).total_seconds()
+
+        value = compute()
+        statement = insert(snapshots).values(key=key, value=json.dumps([version, value]), computed_at=now)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[snapshots.c.key],
+            set_={'value': statement.excluded.value, 'computed_at': statement.excluded.computed_at}
+        ))
+        connection.commit()  # also releases the advisory lock
+        return value, 0.0